@@ -4,17 +4,20 @@ import os
 
 from flask import Flask
 
+from app.commands import upgrade_db, warm_cache
 from app.dummy import dummy
 from app.ping import ping
+from app.profiling import profiling
 from app.routes.logistica import logistica_bp
 from app.utils.logger import get_logger
 from app.utils.config import load_secrets, db, marsmallow, Config
+from app.utils.profiling import init_profiling
 
 logger = get_logger(__name__)
 
 # Active endpoints noted as following:
 # (url_prefix, blueprint_object)
-ACTIVE_ENDPOINTS = (("/", ping), ("/dummy", dummy),("/logistica", logistica_bp))
+ACTIVE_ENDPOINTS = (("/", ping), ("/dummy", dummy),("/logistica", logistica_bp), ("/profiling", profiling))
 
 def create_app():
     """Create Flask app."""
@@ -31,6 +34,9 @@ def create_app():
     
     logger.info("Conexión a la base de datos configurada")
 
+    # opt-in request profiling (PROFILING_SECRET / PROFILING_SAMPLE_RATE)
+    init_profiling(app)
+
     # accepts both /endpoint and /endpoint/ as valid URLs
     app.url_map.strict_slashes = False
 
@@ -38,4 +44,8 @@ def create_app():
     for url, blueprint in ACTIVE_ENDPOINTS:
         app.register_blueprint(blueprint, url_prefix=url)
 
+    # CLI commands (flask --app app <command>)
+    app.cli.add_command(upgrade_db)
+    app.cli.add_command(warm_cache)
+
     return app
\ No newline at end of file
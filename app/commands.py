@@ -0,0 +1,51 @@
+"""Flask CLI commands."""
+
+import click
+from flask.cli import with_appcontext
+
+from app.models import Cliente, GeocodeCache, TravelTimeCache, RoutePlan, PlanRoute, PlanStop
+from app.repositories.logistica_repositories import LogisticaRepository
+from app.services.cache_warmup import CacheWarmer
+from app.services.logistica import Logistica
+from app.utils.config import db
+from app.utils.schema import ensure_schema
+
+# Tablas que administra upgrade-db, en orden de dependencias
+SCHEMA_TABLES = (
+    Cliente.__table__,
+    GeocodeCache.__table__,
+    TravelTimeCache.__table__,
+    RoutePlan.__table__,
+    PlanRoute.__table__,
+    PlanStop.__table__,
+)
+
+
+@click.command("upgrade-db")
+@with_appcontext
+def upgrade_db():
+    """Crea las tablas, columnas e índices que falten y completa los geohash pendientes.
+
+    Es idempotente: correrlo sobre una base ya actualizada no cambia nada.
+    Ejecutarlo antes de desplegar una versión con cambios de modelo:
+    flask --app app upgrade-db
+    """
+    for change in ensure_schema(db.engine, SCHEMA_TABLES) or ["El esquema ya estaba actualizado"]:
+        click.echo(change)
+    updated = LogisticaRepository().backfill_geohashes()
+    click.echo(f"Geohash completado en {updated} clientes")
+
+
+@click.command("warm-cache")
+@click.option("--budget", default=5000, show_default=True, type=int,
+              help="Elementos de Google Maps que puede consumir la precarga.")
+@click.option("--localidad", default=None, help="Precargar solo esta localidad.")
+@with_appcontext
+def warm_cache(budget, localidad):
+    """Precarga geocodificaciones y tiempos de viaje de los clientes conocidos.
+
+    Pensado para correr fuera del horario pico (por ejemplo, desde cron):
+    flask --app app warm-cache --budget 5000
+    """
+    result = CacheWarmer(Logistica(), budget).run(localidad)
+    click.echo(result)
@@ -10,4 +10,49 @@ class LogisticaInterface(ABC):
     @abstractmethod
     def get_user_by_id(self, id_client:str )->Cliente:
         """ """
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    def get_users_by_ids(self, ids: list, columns: list[str] | None = None) -> list[dict]:
+        """Varios clientes por id en una sola consulta."""
+        pass
+
+    @abstractmethod
+    def list_users(self, localidad: str | None = None, after_id: int | None = None, limit: int = 100,
+                   columns: list[str] | None = None) -> list[dict]:
+        """Página de clientes ordenada por id, posterior a after_id."""
+        pass
+
+    @abstractmethod
+    def stream_users(self, localidad: str | None = None, columns: list[str] | None = None,
+                     batch_size: int | None = None):
+        """Generador de todos los clientes, leídos en lotes."""
+        pass
+
+    @abstractmethod
+    def update_client_coordinates(self, id_client: int, latitude: float, longitude: float) -> None:
+        """Actualiza latitud y longitud de un cliente."""
+        pass
+
+    @abstractmethod
+    def get_coordinates_by_address(self, direccion: str) -> dict | None:
+        """Coordenadas de un cliente guardado con esa dirección, con el formato de geocode_address."""
+        pass
+
+    @abstractmethod
+    def get_clients_in_bbox(self, min_lat: float, min_lng: float, max_lat: float, max_lng: float,
+                            limit: int | None = None) -> list[Cliente]:
+        """Clientes cuyas coordenadas caen dentro de la caja indicada."""
+        pass
+
+    @abstractmethod
+    def get_clients_within_radius(self, latitude: float, longitude: float, radius_km: float,
+                                  limit: int | None = None) -> list[tuple[Cliente, float]]:
+        """Clientes a menos de radius_km del punto, con su distancia, ordenados por cercanía."""
+        pass
+
+    @abstractmethod
+    def get_nearest_clients(self, latitude: float, longitude: float, k: int,
+                            max_radius_km: float) -> list[tuple[Cliente, float]]:
+        """Los k clientes más cercanos al punto, con su distancia."""
+        pass
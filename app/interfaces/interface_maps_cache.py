@@ -0,0 +1,33 @@
+"""Interface for the Google Maps cache repository."""
+
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+
+class MapsCacheInterface(ABC):
+    """Acceso a geocodificaciones y tiempos de viaje guardados."""
+
+    @abstractmethod
+    def get_geocode(self, address: str) -> dict | None:
+        """Geocodificación guardada para la dirección, o None."""
+        pass
+
+    @abstractmethod
+    def save_geocode(self, address: str, geocode: dict) -> None:
+        """Guarda (o reemplaza) la geocodificación de una dirección."""
+        pass
+
+    @abstractmethod
+    def get_travel_time(self, origin: str, destination: str, fresh_after: datetime) -> dict | None:
+        """Tiempo de viaje guardado después de fresh_after, o None."""
+        pass
+
+    @abstractmethod
+    def get_cached_pairs(self, origin: str, destinations: list[str], fresh_after: datetime) -> set[str]:
+        """Destinos con tiempo de viaje vigente desde origin."""
+        pass
+
+    @abstractmethod
+    def save_travel_times(self, travel_times: dict) -> None:
+        """Inserta o actualiza tiempos de viaje {(origen, destino): resultado} en una transacción."""
+        pass
@@ -0,0 +1,45 @@
+"""Interface for the route plan repository."""
+
+from abc import ABC, abstractmethod
+from datetime import date
+
+from app.models.route_plan import RoutePlan
+
+
+class RoutePlanInterface(ABC):
+    """Persistencia y consulta de planes de rutas."""
+
+    @abstractmethod
+    def save_plan(self, plan: dict, routes: list[dict]) -> int:
+        """Guarda un plan con sus rutas y paradas en una transacción y devuelve su id."""
+        pass
+
+    @abstractmethod
+    def get_plan(self, plan_id: int) -> RoutePlan | None:
+        """Plan por id."""
+        pass
+
+    @abstractmethod
+    def get_plan_stops(self, plan_id: int) -> list[dict]:
+        """Paradas de un plan, ordenadas por ruta y orden."""
+        pass
+
+    @abstractmethod
+    def get_technician_stops(self, tecnico: str, fecha: date) -> list[dict]:
+        """Paradas de un técnico para una fecha en el plan vigente, por ruta y orden."""
+        pass
+
+    @abstractmethod
+    def get_locality_stops(self, localidad: str, fecha: date) -> list[dict]:
+        """Paradas de una localidad para una fecha en el plan vigente."""
+        pass
+
+    @abstractmethod
+    def get_busy_technicians(self, fecha: date, excluded_localities: list[str]) -> set[str]:
+        """Técnicos ya asignados ese día en planes vigentes de otras localidades."""
+        pass
+
+    @abstractmethod
+    def get_next_visit(self, cliente_id: str, desde: date) -> dict | None:
+        """Primera parada vigente del cliente en o después de la fecha indicada."""
+        pass
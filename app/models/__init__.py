@@ -1,5 +1,7 @@
 """Models package."""
 
 from app.models.cliente import Cliente
+from app.models.maps_cache import GeocodeCache, TravelTimeCache
+from app.models.route_plan import RoutePlan, PlanRoute, PlanStop
 
-__all__ = ['Cliente']
\ No newline at end of file
+__all__ = ['Cliente', 'GeocodeCache', 'TravelTimeCache', 'RoutePlan', 'PlanRoute', 'PlanStop']
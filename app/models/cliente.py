@@ -1,12 +1,22 @@
 """Cliente model module."""
 
 from datetime import datetime
+from sqlalchemy import event
 from app.utils.config import db
+from app.utils.geo import geohash_encode
 
 class Cliente(db.Model):
     """Cliente model."""
     
     __tablename__ = 'clientes'
+    __table_args__ = (
+        # Índice para búsquedas por caja sobre coordenadas ya acotadas por geohash
+        db.Index('ix_clientes_latitud_longitud', 'latitud', 'longitud'),
+        # Listados por localidad paginados por id
+        db.Index('ix_clientes_localidad_id', 'localidad', 'id'),
+        # Coordenadas conocidas por dirección cuando no se puede geocodificar
+        db.Index('ix_clientes_direccion', 'direccion'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(100), nullable=False)
@@ -14,6 +24,7 @@ class Cliente(db.Model):
     localidad = db.Column(db.String(100), nullable=False)  # Campo localidad para agrupar clientes
     latitud = db.Column(db.Float, nullable=True)
     longitud = db.Column(db.Float, nullable=True)
+    geohash = db.Column(db.String(12), nullable=True, index=True)  # Celda geohash de (latitud, longitud)
     telefono = db.Column(db.String(20), nullable=True)
     email = db.Column(db.String(100), nullable=True)
     created_at = db.Column(db.String(100))
@@ -22,6 +33,13 @@ class Cliente(db.Model):
     def __repr__(self):
         """Return string representation of Cliente."""
         return f"<Cliente {self.id}: {self.nombre}>"
+
+    def refresh_geohash(self):
+        """Recalcula el geohash a partir de las coordenadas actuales."""
+        if self.latitud is None or self.longitud is None:
+            self.geohash = None
+        else:
+            self.geohash = geohash_encode(self.latitud, self.longitud)
     
     def to_dict(self):
         """Return dictionary representation of Cliente."""
@@ -32,8 +50,23 @@ class Cliente(db.Model):
             'localidad': self.localidad,
             'latitud': self.latitud,
             'longitud': self.longitud,
+            'geohash': self.geohash,
             'telefono': self.telefono,
             'email': self.email,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'created_at': _format_timestamp(self.created_at),
+            'updated_at': _format_timestamp(self.updated_at)
         }
+
+
+def _format_timestamp(value):
+    """Las columnas de fecha se guardan como texto; solo se formatean si son datetime."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+@event.listens_for(Cliente, 'before_insert')
+@event.listens_for(Cliente, 'before_update')
+def _sync_geohash(mapper, connection, target):
+    """Mantiene el geohash sincronizado con latitud/longitud en cada escritura."""
+    target.refresh_geohash()
@@ -0,0 +1,65 @@
+"""Maps cache models module."""
+
+from datetime import datetime, timezone
+from app.utils.config import db
+
+
+def utcnow():
+    """Naive UTC timestamp, as stored in DateTime columns."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class GeocodeCache(db.Model):
+    """Geocodificación guardada por dirección normalizada."""
+
+    __tablename__ = 'geocode_cache'
+
+    id = db.Column(db.Integer, primary_key=True)
+    address = db.Column(db.String(255), nullable=False, unique=True)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    formatted_address = db.Column(db.String(255), nullable=True)
+    fetched_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+
+    def __repr__(self):
+        """Return string representation of GeocodeCache."""
+        return f"<GeocodeCache {self.address}>"
+
+    def to_dict(self):
+        """Return the same shape as Logistica.geocode_address."""
+        return {
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'formatted_address': self.formatted_address,
+            'cached': True
+        }
+
+
+class TravelTimeCache(db.Model):
+    """Tiempo de viaje guardado por par origen/destino (coordenadas redondeadas)."""
+
+    __tablename__ = 'travel_time_cache'
+    __table_args__ = (
+        db.UniqueConstraint('origin', 'destination', name='uq_travel_time_cache_origin_destination'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    origin = db.Column(db.String(40), nullable=False)
+    destination = db.Column(db.String(40), nullable=False)
+    duration_seconds = db.Column(db.Integer, nullable=False)
+    distance_meters = db.Column(db.Integer, nullable=False)
+    fetched_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+
+    def __repr__(self):
+        """Return string representation of TravelTimeCache."""
+        return f"<TravelTimeCache {self.origin} -> {self.destination}>"
+
+    def to_dict(self):
+        """Return the same shape as Logistica.calculate_travel_time."""
+        return {
+            'distance_meters': self.distance_meters,
+            'distance_text': f"{self.distance_meters / 1000:.1f} km",
+            'duration_seconds': self.duration_seconds,
+            'duration_text': f"{round(self.duration_seconds / 60)} min",
+            'cached': True
+        }
@@ -0,0 +1,136 @@
+"""Route plan models module."""
+
+from app.models.maps_cache import utcnow
+from app.utils.config import db
+
+
+class RoutePlan(db.Model):
+    """Plan de rutas generado en una optimización."""
+
+    __tablename__ = 'route_plans'
+
+    id = db.Column(db.Integer, primary_key=True)
+    fecha = db.Column(db.Date, nullable=False, index=True)  # Primer día del plan
+    origen = db.Column(db.String(20), nullable=False)  # 'csv' o 'db'
+    total_rutas = db.Column(db.Integer, nullable=False)
+    total_paradas = db.Column(db.Integer, nullable=False)
+    rutas_sin_tecnico = db.Column(db.Integer, nullable=False, default=0)  # Rutas sin técnico libre dentro del horizonte de planificación
+    created_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+
+    routes = db.relationship('PlanRoute', backref='plan', lazy='select', order_by='PlanRoute.id')
+
+    def __repr__(self):
+        """Return string representation of RoutePlan."""
+        return f"<RoutePlan {self.id}: {self.fecha}>"
+
+    def to_dict(self):
+        """Return dictionary representation of RoutePlan."""
+        return {
+            'id': self.id,
+            'fecha': self.fecha.isoformat(),
+            'origen': self.origen,
+            'total_rutas': self.total_rutas,
+            'total_paradas': self.total_paradas,
+            'rutas_sin_tecnico': self.rutas_sin_tecnico,
+            'created_at': self.created_at.isoformat()
+        }
+
+
+class PlanRoute(db.Model):
+    """Ruta de un día dentro de un plan."""
+
+    __tablename__ = 'plan_routes'
+    __table_args__ = (
+        db.Index('ix_plan_routes_tecnico_fecha', 'tecnico', 'fecha'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    plan_id = db.Column(db.Integer, db.ForeignKey('route_plans.id'), nullable=False, index=True)
+    route_key = db.Column(db.String(150), nullable=False)
+    localidad = db.Column(db.String(100), nullable=False)
+    fecha = db.Column(db.Date, nullable=False)
+    tecnico = db.Column(db.String(100), nullable=True)
+    depot = db.Column(db.String(100), nullable=True)
+    start_time = db.Column(db.Float, nullable=True)
+    end_time = db.Column(db.Float, nullable=True)
+
+    def __repr__(self):
+        """Return string representation of PlanRoute."""
+        return f"<PlanRoute {self.id}: {self.route_key}>"
+
+    def to_dict(self):
+        """Return dictionary representation of PlanRoute."""
+        return {
+            'id': self.id,
+            'plan_id': self.plan_id,
+            'route_key': self.route_key,
+            'localidad': self.localidad,
+            'fecha': self.fecha.isoformat(),
+            'tecnico': self.tecnico,
+            'depot': self.depot,
+            'start_time': self.start_time,
+            'end_time': self.end_time
+        }
+
+
+class PlanStop(db.Model):
+    """
+    Parada de una ruta.
+
+    Fecha, técnico y localidad se repiten en cada parada para que las consultas
+    frecuentes se resuelvan con un único índice, sin joins.
+    """
+
+    __tablename__ = 'plan_stops'
+    __table_args__ = (
+        # Paradas del día de un técnico, en orden
+        db.Index('ix_plan_stops_tecnico_fecha_orden', 'tecnico', 'fecha', 'orden'),
+        # Plan de una localidad para una fecha; plan_id resuelve el plan vigente desde el índice
+        db.Index('ix_plan_stops_localidad_fecha_plan', 'localidad', 'fecha', 'plan_id'),
+        # Próxima visita de un cliente
+        db.Index('ix_plan_stops_cliente_fecha', 'cliente_id', 'fecha'),
+        db.Index('ix_plan_stops_route_orden', 'route_id', 'orden'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    plan_id = db.Column(db.Integer, db.ForeignKey('route_plans.id'), nullable=False)
+    route_id = db.Column(db.Integer, db.ForeignKey('plan_routes.id'), nullable=False)
+    route_key = db.Column(db.String(150), nullable=False)
+    orden = db.Column(db.Integer, nullable=False)
+    fecha = db.Column(db.Date, nullable=False)
+    tecnico = db.Column(db.String(100), nullable=True)
+    localidad = db.Column(db.String(100), nullable=False)
+    cliente_id = db.Column(db.String(100), nullable=True)
+    domicilio = db.Column(db.String(200), nullable=True)
+    coordinates = db.Column(db.String(40), nullable=True)
+    estimated_arrival = db.Column(db.Float, nullable=True)
+    estimated_completion = db.Column(db.Float, nullable=True)
+    travel_time = db.Column(db.Float, nullable=True)
+    installation_time = db.Column(db.Float, nullable=True)
+    travel_time_estimated = db.Column(db.Boolean, nullable=False, default=False)
+    datos = db.Column(db.JSON, nullable=True)  # Fila original del cliente
+
+    def __repr__(self):
+        """Return string representation of PlanStop."""
+        return f"<PlanStop {self.id}: {self.route_key} #{self.orden}>"
+
+    def to_dict(self):
+        """Return dictionary representation of PlanStop."""
+        return {
+            'id': self.id,
+            'plan_id': self.plan_id,
+            'route_key': self.route_key,
+            'orden': self.orden,
+            'fecha': self.fecha.isoformat(),
+            'tecnico': self.tecnico,
+            'localidad': self.localidad,
+            'cliente_id': self.cliente_id,
+            'domicilio': self.domicilio,
+            'coordinates': self.coordinates,
+            'estimated_arrival': self.estimated_arrival,
+            'estimated_completion': self.estimated_completion,
+            'travel_time': self.travel_time,
+            'installation_time': self.installation_time,
+            'travel_time_estimated': self.travel_time_estimated,
+            'datos': self.datos
+        }
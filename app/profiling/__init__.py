@@ -0,0 +1,5 @@
+"""Profiling __init__ module."""
+
+from app.profiling.views import profiling
+
+__all__ = ["profiling"]
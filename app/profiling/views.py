@@ -0,0 +1,32 @@
+"""Module with endpoints to list and download request profiles."""
+
+from flask import Blueprint, current_app, jsonify, request, send_file
+
+profiling = Blueprint("profiling", __name__)
+
+
+def _authorized():
+    """Profiles expose code paths: require the same secret used to request them."""
+    extension = current_app.extensions.get("request_profiling")
+    token = request.headers.get("X-Profile") or request.args.get("profile")
+    return extension is not None and extension.is_authorized(token)
+
+
+@profiling.route("/")
+def list_profiles():
+    """List the most recent stored profiles, newest first."""
+    if not _authorized():
+        return jsonify({"error": "No autorizado"}), 403
+    store = current_app.extensions["request_profiling"].store
+    return jsonify({"profiles": store.list()}), 200
+
+
+@profiling.route("/<name>")
+def download_profile(name):
+    """Download a profile in collapsed-stack format (flamegraph.pl / speedscope)."""
+    if not _authorized():
+        return jsonify({"error": "No autorizado"}), 403
+    path = current_app.extensions["request_profiling"].store.path(name)
+    if path is None:
+        return jsonify({"error": "Perfil no encontrado"}), 404
+    return send_file(path, mimetype="text/plain", as_attachment=True, download_name=name)
@@ -1,14 +1,234 @@
 """"""
 
+from sqlalchemy import or_, select
 
 from app.interfaces.interface_logistica import LogisticaInterface
 from app.models import Cliente
 from app.utils.config import db
+from app.utils.geo import bbox_around, geohash_cover, haversine_km
 
 
 class LogisticaRepository(LogisticaInterface):
     """"""
 
+    # Radio inicial de búsqueda para k vecinos; se duplica hasta encontrar k clientes
+    NEAREST_INITIAL_RADIUS_KM = 2.0
+
+    # Tamaño de lote para lecturas en streaming
+    STREAM_BATCH_SIZE = 1000
+
+    # Ids por consulta IN; las listas más largas se resuelven en varias consultas
+    IN_BATCH_SIZE = 1000
+
     def get_user_by_id(self, id_client:str ) ->Cliente:
         """ """
-        return db.session().query(Cliente).get(id_client)
+        return db.session.get(Cliente, id_client)
+
+    def get_users_by_ids(self, ids: list, columns: list[str] | None = None) -> list[dict]:
+        """
+        Obtiene varios clientes con consultas IN de hasta IN_BATCH_SIZE ids.
+
+        Args:
+            ids (list): Ids de los clientes
+            columns (list): Columnas a devolver; por defecto todas
+
+        Returns:
+            list: Diccionarios de clientes, en el orden de los ids recibidos
+        """
+        if not ids:
+            return []
+
+        projection = self._projection(columns)
+        unique_ids = list(dict.fromkeys(int(id_client) for id_client in ids))
+        rows = {}
+        for start in range(0, len(unique_ids), self.IN_BATCH_SIZE):
+            stmt = select(*projection).where(Cliente.id.in_(unique_ids[start:start + self.IN_BATCH_SIZE]))
+            rows.update((row['id'], dict(row)) for row in db.session.execute(stmt).mappings())
+        return [rows[int(id_client)] for id_client in ids if int(id_client) in rows]
+
+    def list_users(self, localidad: str | None = None, after_id: int | None = None, limit: int = 100,
+                   columns: list[str] | None = None) -> list[dict]:
+        """
+        Lista clientes paginando por clave (id > after_id), opcionalmente filtrando por localidad.
+
+        La paginación por clave recorre el índice primario sin OFFSET, por lo que cada
+        página cuesta lo mismo sin importar qué tan avanzada esté.
+        """
+        stmt = self._listing_statement(localidad, after_id, columns).limit(limit)
+        return [dict(row) for row in db.session.execute(stmt).mappings()]
+
+    def stream_users(self, localidad: str | None = None, columns: list[str] | None = None,
+                     batch_size: int | None = None):
+        """
+        Recorre todos los clientes con un cursor del lado del servidor.
+
+        Returns:
+            Generador de diccionarios, sin cargar el resultado completo en memoria
+        """
+        batch_size = batch_size or self.STREAM_BATCH_SIZE
+        # La consulta se arma antes de iterar para que las columnas inválidas fallen de inmediato
+        stmt = self._listing_statement(localidad, None, columns).execution_options(yield_per=batch_size)
+        return self._iter_rows(stmt)
+
+    @staticmethod
+    def _iter_rows(stmt):
+        """ """
+        result = db.session.execute(stmt).mappings()
+        try:
+            for row in result:
+                yield dict(row)
+        finally:
+            result.close()
+
+    @staticmethod
+    def _projection(columns: list[str] | None) -> list:
+        """Traduce nombres de columnas a atributos de Cliente; siempre incluye el id."""
+        available = Cliente.__table__.columns
+        if not columns:
+            return [getattr(Cliente, column.key) for column in available]
+
+        unknown = [column for column in columns if column not in available]
+        if unknown:
+            raise ValueError(f"Columnas desconocidas: {', '.join(unknown)}")
+
+        names = ['id'] + [column for column in columns if column != 'id']
+        return [getattr(Cliente, name) for name in names]
+
+    def _listing_statement(self, localidad: str | None, after_id: int | None, columns: list[str] | None):
+        """ """
+        stmt = select(*self._projection(columns))
+        if localidad:
+            stmt = stmt.where(Cliente.localidad == localidad)
+        if after_id is not None:
+            stmt = stmt.where(Cliente.id > after_id)
+        return stmt.order_by(Cliente.id)
+
+    def get_clients_in_bbox(self, min_lat: float, min_lng: float, max_lat: float, max_lng: float,
+                            limit: int | None = None) -> list[Cliente]:
+        """
+        Busca clientes dentro de una caja usando el índice de geohash.
+
+        Los prefijos geohash que cubren la caja se resuelven como rangos sobre el
+        índice B-tree y el filtro exacto de latitud/longitud descarta los bordes.
+        """
+        stmt = self._in_bbox(select(Cliente), min_lat, min_lng, max_lat, max_lng)
+        if limit:
+            stmt = stmt.limit(limit)
+
+        return list(db.session.scalars(stmt))
+
+    @staticmethod
+    def _in_bbox(stmt, min_lat: float, min_lng: float, max_lat: float, max_lng: float):
+        """Agrega a la consulta el filtro por caja (prefijos geohash y coordenadas exactas)."""
+        prefixes = [prefix for prefix in geohash_cover(min_lat, min_lng, max_lat, max_lng) if prefix]
+
+        stmt = stmt.where(
+            Cliente.latitud.between(min_lat, max_lat),
+            Cliente.longitud.between(min_lng, max_lng),
+        )
+        if prefixes:
+            stmt = stmt.where(or_(*[Cliente.geohash.like(f"{prefix}%") for prefix in prefixes]))
+        return stmt
+
+    def get_clients_within_radius(self, latitude: float, longitude: float, radius_km: float,
+                                  limit: int | None = None) -> list[tuple[Cliente, float]]:
+        """
+        Busca clientes dentro de un radio, ordenados por distancia.
+
+        El filtro y el orden se hacen leyendo solo id y coordenadas; únicamente los
+        'limit' más cercanos se cargan como Cliente.
+        """
+        nearest = self._distances_within_radius(latitude, longitude, radius_km)
+        return self._load_with_distance(nearest[:limit] if limit else nearest)
+
+    def get_nearest_clients(self, latitude: float, longitude: float, k: int,
+                            max_radius_km: float = 200.0) -> list[tuple[Cliente, float]]:
+        """
+        Busca los k clientes más cercanos ampliando el radio de búsqueda.
+
+        Un resultado dentro del radio r es exacto: ningún cliente fuera del círculo
+        puede estar más cerca que uno de adentro. Cada ampliación lee solo id y
+        coordenadas; al final se cargan los k clientes elegidos.
+        """
+        radius_km = min(self.NEAREST_INITIAL_RADIUS_KM, max_radius_km)
+        while True:
+            nearest = self._distances_within_radius(latitude, longitude, radius_km)
+            if len(nearest) >= k or radius_km >= max_radius_km:
+                return self._load_with_distance(nearest[:k])
+            radius_km = min(radius_km * 2, max_radius_km)
+
+    def _distances_within_radius(self, latitude: float, longitude: float, radius_km: float) -> list[tuple[int, float]]:
+        """(id, distancia) de los clientes dentro del radio, del más cercano al más lejano."""
+        stmt = self._in_bbox(
+            select(Cliente.id, Cliente.latitud, Cliente.longitud),
+            *bbox_around(latitude, longitude, radius_km)
+        )
+
+        results = []
+        for id_client, client_lat, client_lng in db.session.execute(stmt):
+            distance = haversine_km(latitude, longitude, client_lat, client_lng)
+            if distance <= radius_km:
+                results.append((id_client, distance))
+
+        results.sort(key=lambda item: item[1])
+        return results
+
+    def _load_with_distance(self, distances: list[tuple[int, float]]) -> list[tuple[Cliente, float]]:
+        """Carga los clientes de una lista (id, distancia), conservando su orden."""
+        ids = [id_client for id_client, _ in distances]
+        clientes = {}
+        for start in range(0, len(ids), self.IN_BATCH_SIZE):
+            stmt = select(Cliente).where(Cliente.id.in_(ids[start:start + self.IN_BATCH_SIZE]))
+            clientes.update((cliente.id, cliente) for cliente in db.session.scalars(stmt))
+        return [(clientes[id_client], distance) for id_client, distance in distances if id_client in clientes]
+
+    def get_coordinates_by_address(self, direccion: str) -> dict | None:
+        """
+        Busca un cliente guardado con esa dirección y coordenadas cargadas.
+
+        Returns:
+            dict | None: 'latitude', 'longitude' y 'formatted_address', o None si no hay
+        """
+        stmt = select(Cliente.latitud, Cliente.longitud, Cliente.direccion).where(
+            Cliente.direccion == direccion,
+            Cliente.latitud.is_not(None),
+            Cliente.longitud.is_not(None),
+        ).limit(1)
+        row = db.session.execute(stmt).first()
+        if row is None:
+            return None
+        return {'latitude': row.latitud, 'longitude': row.longitud, 'formatted_address': row.direccion, 'cached': True}
+
+    def update_client_coordinates(self, id_client: int, latitude: float, longitude: float) -> None:
+        """Guarda las coordenadas de un cliente (el geohash se recalcula al guardar)."""
+        cliente = db.session.get(Cliente, id_client)
+        if cliente is None:
+            return
+        cliente.latitud = latitude
+        cliente.longitud = longitude
+        db.session.commit()
+
+    def backfill_geohashes(self, batch_size: int = 1000) -> int:
+        """
+        Completa el geohash de clientes con coordenadas cargadas antes de existir la columna.
+
+        Returns:
+            int: Cantidad de clientes actualizados
+        """
+        updated = 0
+        while True:
+            stmt = (
+                select(Cliente)
+                .where(Cliente.geohash.is_(None),
+                       Cliente.latitud.is_not(None),
+                       Cliente.longitud.is_not(None))
+                .limit(batch_size)
+            )
+            batch = list(db.session.scalars(stmt))
+            if not batch:
+                return updated
+
+            for cliente in batch:
+                cliente.refresh_geohash()
+            db.session.commit()
+            updated += len(batch)
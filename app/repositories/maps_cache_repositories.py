@@ -0,0 +1,92 @@
+"""Repository for the Google Maps cache tables."""
+
+from sqlalchemy import select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.interfaces.interface_maps_cache import MapsCacheInterface
+from app.models import GeocodeCache, TravelTimeCache
+from app.models.maps_cache import utcnow
+from app.utils.config import db
+
+
+class MapsCacheRepository(MapsCacheInterface):
+    """"""
+
+    def get_geocode(self, address: str) -> dict | None:
+        """ """
+        cached = db.session.scalar(select(GeocodeCache).where(GeocodeCache.address == address))
+        return cached.to_dict() if cached else None
+
+    def save_geocode(self, address: str, geocode: dict) -> None:
+        """ """
+        stmt = _upsert(GeocodeCache, ('address',), ('latitude', 'longitude', 'formatted_address', 'fetched_at'))
+        db.session.execute(stmt, {
+            'address': address,
+            'latitude': geocode['latitude'],
+            'longitude': geocode['longitude'],
+            'formatted_address': geocode.get('formatted_address'),
+            'fetched_at': utcnow()
+        })
+        db.session.commit()
+
+    def get_travel_time(self, origin: str, destination: str, fresh_after) -> dict | None:
+        """ """
+        cached = db.session.scalar(
+            select(TravelTimeCache).where(
+                TravelTimeCache.origin == origin,
+                TravelTimeCache.destination == destination,
+                TravelTimeCache.fetched_at >= fresh_after
+            )
+        )
+        return cached.to_dict() if cached else None
+
+    def get_cached_pairs(self, origin: str, destinations: list[str], fresh_after) -> set[str]:
+        """ """
+        if not destinations:
+            return set()
+        stmt = select(TravelTimeCache.destination).where(
+            TravelTimeCache.origin == origin,
+            TravelTimeCache.destination.in_(destinations),
+            TravelTimeCache.fetched_at >= fresh_after
+        )
+        return set(db.session.scalars(stmt))
+
+    def save_travel_times(self, travel_times: dict) -> None:
+        """
+        Inserta o actualiza los pares recibidos con un único upsert en bloque.
+
+        El upsert evita el choque con la restricción única cuando dos workers guardan
+        el mismo par a la vez.
+        """
+        if not travel_times:
+            return
+
+        fetched_at = utcnow()
+        stmt = _upsert(TravelTimeCache, ('origin', 'destination'),
+                       ('duration_seconds', 'distance_meters', 'fetched_at'))
+        db.session.execute(stmt, [
+            {
+                'origin': origin,
+                'destination': destination,
+                'duration_seconds': result['duration_seconds'],
+                'distance_meters': result['distance_meters'],
+                'fetched_at': fetched_at
+            }
+            for (origin, destination), result in travel_times.items()
+        ])
+        db.session.commit()
+
+
+def _upsert(model, keys: tuple, updates: tuple):
+    """INSERT que actualiza las columnas indicadas si ya existe una fila con la misma clave única."""
+    if db.session.get_bind().dialect.name == 'mysql':
+        stmt = mysql_insert(model)
+        return stmt.on_duplicate_key_update({column: stmt.inserted[column] for column in updates})
+
+    # SQLite (desarrollo local); PostgreSQL usa la misma sintaxis ON CONFLICT
+    stmt = sqlite_insert(model)
+    return stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={column: stmt.excluded[column] for column in updates}
+    )
@@ -0,0 +1,125 @@
+"""Repository for persisted route plans."""
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import aliased
+
+from app.interfaces.interface_route_plan import RoutePlanInterface
+from app.models import RoutePlan, PlanRoute, PlanStop
+from app.utils.config import db
+
+
+class RoutePlanRepository(RoutePlanInterface):
+    """"""
+
+    def save_plan(self, plan: dict, routes: list[dict]) -> int:
+        """
+        Guarda el plan completo en una única transacción.
+
+        Las rutas se insertan con el ORM para obtener sus ids; las paradas, que son la
+        mayoría de las filas, van en un solo INSERT de muchos valores.
+
+        Args:
+            plan (dict): Columnas de RoutePlan
+            routes (list): Columnas de PlanRoute más la clave 'stops' con las columnas de cada PlanStop
+
+        Returns:
+            int: Id del plan guardado
+        """
+        try:
+            route_plan = RoutePlan(**plan)
+            db.session.add(route_plan)
+            db.session.flush()
+
+            plan_routes = []
+            for route in routes:
+                columns = {key: value for key, value in route.items() if key != 'stops'}
+                plan_routes.append(PlanRoute(plan_id=route_plan.id, **columns))
+            db.session.add_all(plan_routes)
+            db.session.flush()
+
+            stop_rows = [
+                {
+                    **stop,
+                    'plan_id': route_plan.id,
+                    'route_id': plan_route.id,
+                    'route_key': plan_route.route_key,
+                    'fecha': plan_route.fecha,
+                    'tecnico': plan_route.tecnico
+                }
+                for plan_route, route in zip(plan_routes, routes)
+                for stop in route['stops']
+            ]
+            if stop_rows:
+                db.session.execute(insert(PlanStop), stop_rows)
+
+            db.session.commit()
+            return route_plan.id
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def get_plan(self, plan_id: int) -> RoutePlan | None:
+        """ """
+        return db.session.get(RoutePlan, plan_id)
+
+    def get_plan_stops(self, plan_id: int) -> list[dict]:
+        """ """
+        stmt = select(PlanStop).where(PlanStop.plan_id == plan_id).order_by(PlanStop.route_id, PlanStop.orden)
+        return [stop.to_dict() for stop in db.session.scalars(stmt)]
+
+    def get_technician_stops(self, tecnico: str, fecha) -> list[dict]:
+        """ """
+        stmt = (
+            select(PlanStop)
+            .where(PlanStop.tecnico == tecnico, PlanStop.fecha == fecha, _is_current_plan())
+            .order_by(PlanStop.route_id, PlanStop.orden)
+        )
+        return [stop.to_dict() for stop in db.session.scalars(stmt)]
+
+    def get_locality_stops(self, localidad: str, fecha) -> list[dict]:
+        """ """
+        stmt = (
+            select(PlanStop)
+            .where(PlanStop.localidad == localidad, PlanStop.fecha == fecha, _is_current_plan())
+            .order_by(PlanStop.route_id, PlanStop.orden)
+        )
+        return [stop.to_dict() for stop in db.session.scalars(stmt)]
+
+    def get_busy_technicians(self, fecha, excluded_localities: list[str]) -> set[str]:
+        """Técnicos con ruta en el plan vigente de otras localidades para esa fecha."""
+        stmt = (
+            select(PlanStop.tecnico)
+            .where(PlanStop.fecha == fecha, PlanStop.tecnico.is_not(None),
+                   PlanStop.localidad.not_in(excluded_localities), _is_current_plan())
+            .distinct()
+        )
+        return set(db.session.scalars(stmt))
+
+    def get_next_visit(self, cliente_id: str, desde) -> dict | None:
+        """ """
+        stmt = (
+            select(PlanStop)
+            .where(PlanStop.cliente_id == cliente_id, PlanStop.fecha >= desde, _is_current_plan())
+            .order_by(PlanStop.fecha, PlanStop.id)
+            .limit(1)
+        )
+        stop = db.session.scalar(stmt)
+        return stop.to_dict() if stop else None
+
+
+def _is_current_plan():
+    """
+    Condición para quedarse con las paradas del plan vigente de su localidad y fecha.
+
+    Cada carga crea un plan nuevo: volver a planificar una localidad para una fecha
+    reemplaza al plan anterior sin borrarlo, y los planes de otras localidades siguen
+    vigentes. Se resuelve con ix_plan_stops_localidad_fecha_plan.
+    """
+    newer = aliased(PlanStop)
+    latest_plan = (
+        select(func.max(newer.plan_id))
+        .where(newer.localidad == PlanStop.localidad, newer.fecha == PlanStop.fecha)
+        .correlate(PlanStop)
+        .scalar_subquery()
+    )
+    return PlanStop.plan_id == latest_plan
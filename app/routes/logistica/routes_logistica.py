@@ -1,11 +1,14 @@
 """ """
 
-from flask import request, jsonify
+from flask import request, jsonify, Response, stream_with_context
 from werkzeug.utils import secure_filename
+from datetime import date
+import json
 import os
 import tempfile
 from app.routes.logistica import logistica_bp
 from app.services.logistica import Logistica
+from app.utils.uploads import upload_format
 
 
 @logistica_bp.route('/upload_csv', methods=['POST'])
@@ -13,8 +16,12 @@ def upload_csv():
     """
     Recibe un archivo CSV y lo procesa utilizando la función csv_to_user_dict de la clase Logistica
 
-    El archivo CSV debe enviarse como un FormData con el campo 'file'
+    El archivo debe enviarse como un FormData con el campo 'file'. Se aceptan .csv, CSV comprimidos
+    (.csv.gz, .gz o .zip con un CSV) y planillas .xlsx; se descomprimen y leen de forma incremental
     Opcionalmente se puede especificar el campo que se usará como clave para cada usuario con el parámetro 'user_key_field'
+    y el primer día del plan con 'fecha' (YYYY-MM-DD, por defecto hoy). El plan queda guardado y su id se devuelve en 'plan_id';
+    'rutas_sin_tecnico' lista las rutas que no encontraron un técnico libre. 'simulation' trae el riesgo
+    de horas extra de cada ruta (ver /simular_rutas)
 
     Returns:
         dict: Diccionario con los datos de usuarios procesados del CSV
@@ -27,43 +34,329 @@ def upload_csv():
 
         if file.filename == '':
             return jsonify({'error': 'No se seleccionó ningún archivo'}), 400
-        if not file.filename.endswith('.csv'):
-            return jsonify({'error': 'El archivo debe ser un CSV'}), 400
+        if upload_format(file.filename) is None:
+            return jsonify({'error': 'El archivo debe ser un CSV, un CSV comprimido (.gz/.zip) o una planilla .xlsx'}), 400
 
         user_key_field = request.form.get('user_key_field', 'email')
+        plan_date = _parse_date(request.form.get('fecha'))
 
-        temp_dir = tempfile.gettempdir()
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(temp_dir, filename)
-        file.save(filepath)
+        # Archivo temporal único por request: uploads concurrentes con el mismo nombre no se pisan
+        fd, filepath = tempfile.mkstemp(suffix=f"_{secure_filename(file.filename)}")
+        os.close(fd)
+        try:
+            file.save(filepath)
 
-        logistica = Logistica()
-        user_dict = logistica.csv_to_user_dict(filepath, user_key_field)
+            logistica = Logistica()
+            user_dict = logistica.csv_to_user_dict(filepath, user_key_field)
+        finally:
+            os.remove(filepath)
+
+        if not user_dict:
+            return jsonify({'error': 'El archivo no contiene clientes'}), 400
 
-        os.remove(filepath)
+        routes = logistica.create_optimized_routes(user_dict)
+        saved_plan = logistica.save_route_plan(routes, plan_date, user_key_field, origen='csv') or {}
 
-        logistica.create_optimized_routes(user_dict)
+        try:
+            simulation = logistica.simulate_routes(routes)
+        except ValueError as e:
+            # El plan ya está creado: un plan demasiado grande para simular no lo invalida
+            simulation = {'error': str(e)}
 
         return jsonify({
             'success': True,
             'message': f'Archivo CSV procesado correctamente: {len(user_dict)} usuarios',
             'users': user_dict,
-            "data": user_dict
+            "data": user_dict,
+            'simulation': simulation,
+            'plan_id': saved_plan.get('plan_id'),
+            'rutas_sin_tecnico': saved_plan.get('rutas_sin_tecnico', [])
         })
 
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @logistica_bp.route('/get_users', methods=['GET'])
 def get_users():
+    """
+    Devuelve clientes desde la base de datos.
+
+    Query params:
+        id: Devuelve un único cliente
+        ids: Lista de ids separados por coma (hasta 1000), resuelta en una sola consulta
+        localidad: Filtra por localidad
+        after_id: Último id recibido, para pedir la página siguiente
+        limit: Tamaño de página (por defecto 100)
+        fields: Columnas a devolver separadas por coma
+    """
+    try:
+        logistica = Logistica()
+
+        id_client = request.args.get('id')
+        if id_client:
+            return jsonify({'user': logistica.get_client(id_client)}), 200
+
+        result = logistica.get_clients(
+            ids=_list_arg('ids', int),
+            localidad=request.args.get('localidad'),
+            after_id=request.args.get('after_id', type=int),
+            limit=request.args.get('limit', default=100, type=int),
+            fields=_list_arg('fields')
+        )
+        return jsonify({
+            'users': result['clientes'],
+            'next_after_id': result['next_after_id']
+        }), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@logistica_bp.route('/clientes/export', methods=['GET'])
+def export_clients():
+    """
+    Exporta clientes como JSON por líneas (NDJSON), leyendo la base en streaming.
+
+    Query params: localidad y fields (columnas separadas por coma), ambos opcionales
+    """
     try:
         logistica = Logistica()
-        user = logistica.prueba_db()
-        if user:
-            user_dict = user.to_dict()
-        else:
-            user_dict = None
-        return jsonify({'user': user_dict}), 200
+        rows = logistica.export_clients(request.args.get('localidad'), _list_arg('fields'))
+
+        def generate():
+            for row in rows:
+                yield json.dumps(row, default=str) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@logistica_bp.route('/optimize_from_db', methods=['POST'])
+def optimize_from_db():
+    """
+    Crea rutas optimizadas con clientes de la base de datos en lugar de un CSV.
+
+    Body JSON: {"localidad": "...", "ids": [1, 2, 3]} (al menos uno de los dos) y opcionalmente "fecha" (YYYY-MM-DD)
+    """
+    try:
+        payload = request.get_json(silent=True) or {}
+        localidad = payload.get('localidad')
+        ids = payload.get('ids')
+        if not localidad and not ids:
+            return jsonify({'error': "Se debe indicar 'localidad' o 'ids'"}), 400
+
+        plan_date = _parse_date(payload.get('fecha'))
+
+        logistica = Logistica()
+        clients = logistica.load_clients_for_planning(localidad, ids)
+        routes = logistica.create_optimized_routes(clients)
+        saved_plan = logistica.save_route_plan(routes, plan_date, 'id', origen='db') or {}
+
+        try:
+            simulation = logistica.simulate_routes(routes)
+        except ValueError as e:
+            # El plan ya está creado: un plan demasiado grande para simular no lo invalida
+            simulation = {'error': str(e)}
+
+        return jsonify({
+            'success': True,
+            'message': f'Rutas creadas para {len(clients)} clientes',
+            'routes': routes,
+            'simulation': simulation,
+            'plan_id': saved_plan.get('plan_id'),
+            'rutas_sin_tecnico': saved_plan.get('rutas_sin_tecnico', [])
+        }), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@logistica_bp.route('/simular_rutas', methods=['POST'])
+def simulate_routes():
+    """
+    Simula un plan de rutas y devuelve la probabilidad de cumplirlo.
+
+    Body JSON: {"routes": {...plan devuelto por la optimización...}}, con hasta SIMULATION_MAX_STOPS paradas
+    """
+    try:
+        payload = request.get_json(silent=True) or {}
+        routes = payload.get('routes')
+        if not isinstance(routes, dict):
+            return jsonify({'error': "Se debe enviar el plan en el campo 'routes'"}), 400
+
+        logistica = Logistica()
+        return jsonify({'simulation': logistica.simulate_routes(routes)}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@logistica_bp.route('/maps/estado', methods=['GET'])
+def maps_quota_status():
+    """Devuelve el consumo diario de Google Maps y si el modo degradado está activo."""
+    try:
+        logistica = Logistica()
+        return jsonify(logistica.maps_quota_status()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@logistica_bp.route('/planes/<int:plan_id>', methods=['GET'])
+def get_route_plan(plan_id):
+    """Devuelve un plan guardado con sus rutas y paradas."""
+    try:
+        logistica = Logistica()
+        plan = logistica.get_route_plan(plan_id)
+        if plan is None:
+            return jsonify({'error': 'Plan no encontrado'}), 404
+        return jsonify({'plan': plan}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@logistica_bp.route('/tecnicos/<tecnico>/paradas', methods=['GET'])
+def get_technician_stops(tecnico):
+    """
+    Devuelve las paradas de un técnico para una fecha, en orden de visita.
+
+    Query params: fecha (YYYY-MM-DD, por defecto hoy)
+    """
+    try:
+        fecha = _parse_date(request.args.get('fecha'))
+        logistica = Logistica()
+        paradas = logistica.get_technician_stops(tecnico, fecha)
+        return jsonify({'tecnico': tecnico, 'fecha': fecha.isoformat(), 'paradas': paradas}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@logistica_bp.route('/localidades/<localidad>/plan', methods=['GET'])
+def get_locality_plan(localidad):
+    """
+    Devuelve las rutas planificadas de una localidad para una fecha.
+
+    Query params: fecha (YYYY-MM-DD, por defecto hoy)
+    """
+    try:
+        fecha = _parse_date(request.args.get('fecha'))
+        logistica = Logistica()
+        rutas = logistica.get_locality_plan(localidad, fecha)
+        return jsonify({'localidad': localidad, 'fecha': fecha.isoformat(), 'rutas': rutas}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@logistica_bp.route('/clientes/<cliente_id>/proxima_visita', methods=['GET'])
+def get_next_visit(cliente_id):
+    """Devuelve la próxima visita planificada de un cliente, desde hoy."""
+    try:
+        logistica = Logistica()
+        visita = logistica.get_next_visit(cliente_id, date.today())
+        return jsonify({'cliente_id': cliente_id, 'proxima_visita': visita}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def _parse_date(value):
+    """Convierte un texto YYYY-MM-DD en fecha; sin valor devuelve hoy."""
+    if not value:
+        return date.today()
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Fecha inválida: '{value}' (formato esperado YYYY-MM-DD)")
+
+
+def _list_arg(name, cast=str):
+    """Lee un parámetro del query string con valores separados por coma."""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return [cast(item.strip()) for item in value.split(',') if item.strip()]
+    except ValueError:
+        raise ValueError(f"El parámetro '{name}' tiene un formato inválido")
+
+def _required_float_args(*names):
+    """Lee parámetros numéricos obligatorios del query string."""
+    values = []
+    for name in names:
+        value = request.args.get(name, type=float)
+        if value is None:
+            raise ValueError(f"El parámetro '{name}' es obligatorio y debe ser numérico")
+        values.append(value)
+    return values
+
+
+@logistica_bp.route('/clientes/bbox', methods=['GET'])
+def get_clients_in_bbox():
+    """
+    Devuelve los clientes dentro de una caja de coordenadas.
+
+    Query params: min_lat, min_lng, max_lat, max_lng y opcionalmente limit (1 a 1000, por defecto 1000)
+    """
+    try:
+        min_lat, min_lng, max_lat, max_lng = _required_float_args('min_lat', 'min_lng', 'max_lat', 'max_lng')
+        limit = request.args.get('limit', type=int)
+
+        logistica = Logistica()
+        clientes = logistica.find_clients_in_bbox(min_lat, min_lng, max_lat, max_lng, limit)
+        return jsonify({'clientes': clientes, 'total': len(clientes)}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@logistica_bp.route('/clientes/cercanos', methods=['GET'])
+def get_clients_near():
+    """
+    Devuelve los clientes a menos de 'radio_km' del punto (lat, lng), ordenados por distancia.
+
+    Query params: lat, lng, radio_km (hasta 200) y opcionalmente limit (1 a 1000, por defecto 1000)
+    """
+    try:
+        lat, lng, radius_km = _required_float_args('lat', 'lng', 'radio_km')
+        limit = request.args.get('limit', type=int)
+
+        logistica = Logistica()
+        clientes = logistica.find_clients_near(lat, lng, radius_km, limit)
+        return jsonify({'clientes': clientes, 'total': len(clientes)}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@logistica_bp.route('/clientes/mas_cercanos', methods=['GET'])
+def get_nearest_clients():
+    """
+    Devuelve los k clientes más cercanos al punto (lat, lng).
+
+    Query params: lat, lng, k (1 a 1000, por defecto 10) y opcionalmente radio_max_km (hasta 200, valor por defecto)
+    """
+    try:
+        lat, lng = _required_float_args('lat', 'lng')
+        k = request.args.get('k', default=10, type=int)
+        max_radius_km = request.args.get('radio_max_km', default=Logistica.MAX_SEARCH_RADIUS_KM, type=float)
+
+        logistica = Logistica()
+        clientes = logistica.find_nearest_clients(lat, lng, k, max_radius_km)
+        return jsonify({'clientes': clientes, 'total': len(clientes)}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -0,0 +1,145 @@
+"""
+Módulo para precargar la caché de Google Maps con los clientes conocidos.
+"""
+from app.models.maps_cache import utcnow
+from app.services.maps_quota import MAPS_UNAVAILABLE_ERROR
+from app.utils.geo import normalize_coordinates, parse_coordinates
+from app.utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+# Destinos por consulta a Distance Matrix (máximo de la API)
+MATRIX_BATCH_SIZE = 25
+
+
+class CacheWarmer:
+    """
+    Clase para precargar, fuera del horario pico, geocodificaciones y tiempos de viaje
+    depósito→cliente y entre clientes de una misma localidad, dentro de un presupuesto
+    de elementos de la API.
+    """
+
+    def __init__(self, logistica, budget, page_size=500):
+        """
+        Constructor del precargador.
+
+        Args:
+            logistica: Instancia de Logistica (API, caché, repositorio y depósitos)
+            budget: Elementos de la API que puede consumir esta ejecución
+            page_size: Clientes leídos por página de la tabla clientes
+        """
+        self.logistica = logistica
+        self.budget = budget
+        self.page_size = page_size
+        self.used = 0
+        self.summary = {'geocodificados': 0, 'tiempos_depositos': 0, 'tiempos_localidades': 0}
+
+    def run(self, localidad=None):
+        """
+        Ejecuta la precarga completa.
+
+        Args:
+            localidad: Si se indica, solo precarga esa localidad
+
+        Returns:
+            Diccionario con lo precargado y los elementos consumidos
+        """
+        clients_by_locality = self._load_clients(localidad)
+        depot_locator = self.logistica.route_optimizer.depot_locator
+
+        # Primero depósito→cliente: es el tramo que usa cada ruta al empezar el día
+        for locality_clients in clients_by_locality.values():
+            for depot, coordinates in self._group_by_depot(locality_clients, depot_locator).items():
+                self.summary['tiempos_depositos'] += self._warm_pairs(depot, coordinates)
+
+        # Luego los pares entre clientes de la misma localidad, de la más chica a la más grande
+        for locality_clients in sorted(clients_by_locality.values(), key=len):
+            coordinates = list(dict.fromkeys(client['coordinates'] for client in locality_clients))
+            for origin in coordinates:
+                if self._exhausted():
+                    break
+                destinations = [destination for destination in coordinates if destination != origin]
+                self.summary['tiempos_localidades'] += self._warm_pairs(origin, destinations)
+
+        result = {**self.summary, 'elementos_usados': self.used, 'presupuesto': self.budget}
+        logger.info("Precarga de caché de Google Maps finalizada", extra=result)
+        return result
+
+    def _load_clients(self, localidad):
+        """
+        Recorre la tabla clientes por páginas, geocodificando los que no tienen coordenadas.
+
+        Returns:
+            Diccionario {localidad: [{'id', 'coordinates'}]}
+        """
+        repository = self.logistica.repository
+        fields = ['direccion', 'localidad', 'latitud', 'longitud']
+        clients_by_locality = {}
+        after_id = None
+
+        while True:
+            page = repository.list_users(localidad, after_id, self.page_size, fields)
+            if not page:
+                return clients_by_locality
+            after_id = page[-1]['id']
+
+            for row in page:
+                if row['latitud'] is None or row['longitud'] is None:
+                    if self._exhausted():
+                        continue
+                    geocode = self.logistica.geocode_address(row['direccion'])
+                    # Las direcciones ya guardadas en la caché y los rechazos por cuota no consumen la API
+                    if not geocode.get('cached') and geocode.get('error_type') != MAPS_UNAVAILABLE_ERROR:
+                        self.used += 1
+                    if 'latitude' not in geocode:
+                        continue
+                    row['latitud'], row['longitud'] = geocode['latitude'], geocode['longitude']
+                    repository.update_client_coordinates(row['id'], row['latitud'], row['longitud'])
+                    self.summary['geocodificados'] += 1
+
+                clients_by_locality.setdefault(row['localidad'], []).append({
+                    'id': row['id'],
+                    'coordinates': f"{row['latitud']},{row['longitud']}"
+                })
+
+    @staticmethod
+    def _group_by_depot(clients, depot_locator):
+        """Agrupa las coordenadas de una localidad bajo el depósito más cercano a su centroide."""
+        points = [parse_coordinates(client['coordinates']) for client in clients]
+        latitude = sum(lat for lat, _ in points) / len(points)
+        longitude = sum(lng for _, lng in points) / len(points)
+        depot = depot_locator.nearest(latitude, longitude)
+        return {depot['coordinates']: list(dict.fromkeys(client['coordinates'] for client in clients))}
+
+    def _warm_pairs(self, origin, destinations):
+        """
+        Consulta los pares origen→destino que no están vigentes en la caché.
+
+        Returns:
+            Cantidad de tiempos de viaje guardados
+        """
+        fresh_after = utcnow() - self.logistica.travel_cache_ttl
+        cache = self.logistica.maps_cache
+        warmed = 0
+
+        for start in range(0, len(destinations), MATRIX_BATCH_SIZE):
+            batch = destinations[start:start + MATRIX_BATCH_SIZE]
+            cached = cache.get_cached_pairs(
+                normalize_coordinates(origin),
+                [normalize_coordinates(destination) for destination in batch],
+                fresh_after
+            )
+            pending = [destination for destination in batch if normalize_coordinates(destination) not in cached]
+            pending = pending[:max(0, self.budget - self.used)]
+            if not pending:
+                continue
+
+            self.used += len(pending)
+            warmed += len(self.logistica.fetch_travel_times(origin, pending))
+
+        return warmed
+
+    def _exhausted(self):
+        """ """
+        return self.used >= self.budget
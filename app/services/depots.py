@@ -0,0 +1,86 @@
+"""
+Módulo para ubicar el depósito (base de técnicos) más cercano a un punto.
+"""
+import math
+
+from app.utils.geo import geohash_cell_size, geohash_encode, geohash_neighbors, haversine_km, parse_coordinates
+
+# Kilómetros por grado de latitud
+KM_PER_DEGREE = 111.2
+
+
+class DepotLocator:
+    """
+    Índice espacial de depósitos por celdas geohash.
+
+    Para cada precisión se agrupan los depósitos por celda; la búsqueda revisa la
+    celda del punto y sus vecinas y solo pasa a una precisión más gruesa si el
+    mejor candidato podría no ser el más cercano.
+    """
+
+    PRECISIONS = (5, 4, 3, 2, 1)
+
+    def __init__(self, depots):
+        """
+        Constructor del índice.
+
+        Args:
+            depots: Lista de depósitos con 'nombre' y 'coordinates' ("lat,lng")
+        """
+        if not depots:
+            raise ValueError("Se necesita al menos un depósito")
+
+        self.depots = []
+        for depot in depots:
+            latitude, longitude = parse_coordinates(depot['coordinates'])
+            self.depots.append({**depot, 'latitude': latitude, 'longitude': longitude})
+
+        self.by_name = {depot['nombre']: depot for depot in self.depots}
+        self.cells = {precision: {} for precision in self.PRECISIONS}
+        for depot in self.depots:
+            for precision in self.PRECISIONS:
+                cell = geohash_encode(depot['latitude'], depot['longitude'], precision)
+                self.cells[precision].setdefault(cell, []).append(depot)
+
+    def nearest(self, latitude, longitude):
+        """
+        Devuelve el depósito más cercano al punto.
+
+        Args:
+            latitude: Latitud del punto
+            longitude: Longitud del punto
+
+        Returns:
+            Diccionario del depósito más cercano
+        """
+        if len(self.depots) == 1:
+            return self.depots[0]
+
+        for precision in self.PRECISIONS:
+            index = self.cells[precision]
+            candidates = [
+                depot
+                for cell in geohash_neighbors(geohash_encode(latitude, longitude, precision))
+                for depot in index.get(cell, [])
+            ]
+            if not candidates:
+                continue
+
+            best, distance = self._closest(candidates, latitude, longitude)
+            # Cualquier depósito fuera de las 9 celdas está al menos a un ancho de celda
+            height, width = geohash_cell_size(precision)
+            covered_km = min(height * KM_PER_DEGREE,
+                             width * KM_PER_DEGREE * math.cos(math.radians(latitude)))
+            if distance <= covered_km:
+                return best
+
+        return self._closest(self.depots, latitude, longitude)[0]
+
+    @staticmethod
+    def _closest(depots, latitude, longitude):
+        """ """
+        distances = [
+            (depot, haversine_km(latitude, longitude, depot['latitude'], depot['longitude']))
+            for depot in depots
+        ]
+        return min(distances, key=lambda item: item[1])
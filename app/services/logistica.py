@@ -1,14 +1,21 @@
-import csv
+import logging
 import os
 
-from functools import lru_cache
+from datetime import date, timedelta
 
 from dotenv import load_dotenv
 import requests
+from app.models.maps_cache import utcnow
+from app.utils.config import db, load_depots
+from app.utils.geo import normalize_coordinates
 from app.utils.logger import get_logger
-import chardet
+from app.utils.uploads import detect_encoding, iter_rows, upload_format
+from app.services.maps_quota import MAPS_UNAVAILABLE_ERROR, MapsQuotaManager, SERVICE_ERROR_STATUSES
 from app.services.route_optimizer import RouteOptimizer
+from app.services.route_simulator import RouteSimulator
 from app.repositories.logistica_repositories import LogisticaRepository
+from app.repositories.maps_cache_repositories import MapsCacheRepository
+from app.repositories.route_plan_repositories import RoutePlanRepository
 
 logger = get_logger(__name__)
 
@@ -18,9 +25,21 @@ class Logistica:
         """ constructor """
         load_dotenv()
         self.repository = LogisticaRepository()
+        self.plan_repository = RoutePlanRepository()
         self.goole_maps_api_key = os.getenv("GOOGLE_MAPS_API_KEY")
         self.hf_token = os.getenv("HF_TOKEN")
-        self.default_reference_point = "-34.6554574,-59.4324731"
+        self.maps_quota = MapsQuotaManager.from_env()
+        self.maps_timeout = float(os.getenv("MAPS_TIMEOUT_S", "10"))
+        # Permite apuntar a un servidor local que imita la API (pruebas de carga)
+        self.maps_base_url = os.getenv("GOOGLE_MAPS_BASE_URL", "https://maps.googleapis.com").rstrip("/")
+        self.maps_cache = MapsCacheRepository()
+        self.travel_cache_ttl = timedelta(days=float(os.getenv("TRAVEL_CACHE_TTL_DAYS", "7")))
+        # Tiempos de viaje consultados durante una planificación; se guardan juntos al terminar
+        self._pending_travel_times = {}
+        # Geocodificaciones resueltas en esta instancia (no guarda los rechazos por cuota)
+        self._geocoded = {}
+        self.depots = load_depots()
+        self.default_reference_point = self.depots[0]["coordinates"]
         self.tecnicos = {
             "tecnico1": "antonio",
             "tecnico2": "andy",
@@ -29,6 +48,10 @@ class Logistica:
         self.unidades = {
             "unidade1": ["antonio", "jose"],
         }
+        # Técnicos que reciben rutas en los planes guardados (separados por coma)
+        self.plan_technicians = [
+            name.strip() for name in os.getenv("TECNICOS", "antonio,andy").split(",") if name.strip()
+        ]
         self.citys = {
             "mercedes": [],
             "chivilco": [],
@@ -46,46 +69,226 @@ class Logistica:
             google_maps_api_key=self.goole_maps_api_key,
             default_reference_point=self.default_reference_point,
             installation_times=self.time,
-            use_llm=use_llm
+            use_llm=use_llm,
+            depots=self.depots
         )
         
+        self.route_simulator = RouteSimulator(
+            work_start=self.route_optimizer.work_start,
+            work_end=self.route_optimizer.work_end,
+            n_scenarios=int(os.getenv("SIMULATION_SCENARIOS", "10000")),
+            max_stops=int(os.getenv("SIMULATION_MAX_STOPS", "500"))
+        )
+
         if use_llm:
             logger.info("Optimizador de rutas configurado para usar LLM de Hugging Face")
         else:
             logger.info("Optimizador de rutas configurado en modo tradicional (sin LLM)")
 
 
-    def prueba_db(self):
-        """"""
-        data = self.repository.get_user_by_id("1")
+    # Límite de clientes por página en los listados
+    MAX_PAGE_SIZE = 1000
+
+    # Radio máximo de las búsquedas de clientes por cercanía (km)
+    MAX_SEARCH_RADIUS_KM = 200.0
+
+    # Días hábiles que una ruta se puede correr buscando un técnico libre antes de quedar sin asignar
+    PLAN_HORIZON_DAYS = 60
+
+    def get_client(self, id_client: str) -> dict | None:
+        """Devuelve un cliente por id o None si no existe."""
+        cliente = self.repository.get_user_by_id(id_client)
+        return cliente.to_dict() if cliente else None
+
+    def get_clients(self, ids: list | None = None, localidad: str | None = None, after_id: int | None = None,
+                    limit: int = 100, fields: list[str] | None = None) -> dict:
+        """
+        Obtiene clientes en bloque: por lista de ids o paginados por localidad.
+
+        Args:
+            ids (list): Ids a buscar (hasta MAX_PAGE_SIZE); si se indica, ignora la paginación
+            localidad (str): Filtra por localidad
+            after_id (int): Último id de la página anterior
+            limit (int): Tamaño de página
+            fields (list): Columnas a devolver
+
+        Returns:
+            dict: {'clientes': [...], 'next_after_id': id para pedir la página siguiente o None}
+        """
+        if ids:
+            if len(ids) > self.MAX_PAGE_SIZE:
+                raise ValueError(f"Se pueden pedir hasta {self.MAX_PAGE_SIZE} ids por consulta")
+            return {
+                'clientes': self.repository.get_users_by_ids(ids, fields),
+                'next_after_id': None
+            }
+
+        limit = max(1, min(limit, self.MAX_PAGE_SIZE))
+        clientes = self.repository.list_users(localidad, after_id, limit, fields)
+        next_after_id = clientes[-1]['id'] if len(clientes) == limit else None
+        return {'clientes': clientes, 'next_after_id': next_after_id}
+
+    def export_clients(self, localidad: str | None = None, fields: list[str] | None = None):
+        """Generador de clientes leídos con cursor en streaming, para exportaciones grandes."""
+        return self.repository.stream_users(localidad, fields)
+
+    def load_clients_for_planning(self, localidad: str | None = None, ids: list | None = None) -> list[dict]:
+        """
+        Carga clientes desde la base con la forma de las filas del CSV de carga,
+        para planificar rutas sin necesidad de subir un archivo.
+
+        Returns:
+            list: Diccionarios con 'Domicilio', 'Localidad' y coordenadas si están cargadas
+        """
+        fields = ['nombre', 'direccion', 'localidad', 'latitud', 'longitud', 'email', 'telefono']
+        if ids:
+            rows = self.repository.get_users_by_ids(ids, fields)
+        else:
+            rows = self.repository.stream_users(localidad, fields)
+
+        return [self._client_row_for_planning(row) for row in rows]
+
+    @staticmethod
+    def _client_row_for_planning(row: dict) -> dict:
+        """ """
+        return {
+            'id': row['id'],
+            'Nombre': row['nombre'],
+            'Domicilio': row['direccion'],
+            'Localidad': row['localidad'],
+            'email': row['email'],
+            'telefono': row['telefono'],
+            'latitud': row['latitud'],
+            'longitud': row['longitud']
+        }
+
+    def find_clients_in_bbox(self, min_lat: float, min_lng: float, max_lat: float, max_lng: float,
+                             limit: int | None = None) -> list[dict]:
+        """
+        Devuelve los clientes dentro de una caja, hasta 'limit' (como máximo MAX_PAGE_SIZE).
+
+        Returns:
+            list: Lista de diccionarios de clientes
+        """
+        limit = self._search_limit(limit, 'limit')
+        clientes = self.repository.get_clients_in_bbox(min_lat, min_lng, max_lat, max_lng, limit)
+        return [cliente.to_dict() for cliente in clientes]
+
+    def find_clients_near(self, latitude: float, longitude: float, radius_km: float,
+                          limit: int | None = None) -> list[dict]:
+        """
+        Devuelve los clientes dentro de un radio (hasta MAX_SEARCH_RADIUS_KM), ordenados por
+        distancia, hasta 'limit' (como máximo MAX_PAGE_SIZE).
+
+        Returns:
+            list: Lista de diccionarios de clientes con el campo 'distancia_km'
+        """
+        self._check_search_radius(radius_km, 'radio_km')
+        limit = self._search_limit(limit, 'limit')
+        results = self.repository.get_clients_within_radius(latitude, longitude, radius_km, limit)
+        return [self._client_with_distance(cliente, distance) for cliente, distance in results]
 
+    def find_nearest_clients(self, latitude: float, longitude: float, k: int,
+                             max_radius_km: float = MAX_SEARCH_RADIUS_KM) -> list[dict]:
+        """
+        Devuelve los k clientes más cercanos al punto, candidatos para armar una ruta.
+
+        Raises:
+            ValueError: Si k no está entre 1 y MAX_PAGE_SIZE o el radio supera MAX_SEARCH_RADIUS_KM
+
+        Returns:
+            list: Lista de diccionarios de clientes con el campo 'distancia_km'
+        """
+        if not 1 <= k <= self.MAX_PAGE_SIZE:
+            raise ValueError(f"El parámetro 'k' debe estar entre 1 y {self.MAX_PAGE_SIZE}")
+        self._check_search_radius(max_radius_km, 'radio_max_km')
+        results = self.repository.get_nearest_clients(latitude, longitude, k, max_radius_km)
+        return [self._client_with_distance(cliente, distance) for cliente, distance in results]
+
+    def _search_limit(self, limit: int | None, name: str) -> int:
+        """Valida el límite de una búsqueda; sin límite se devuelven hasta MAX_PAGE_SIZE clientes."""
+        if limit is None:
+            return self.MAX_PAGE_SIZE
+        if not 1 <= limit <= self.MAX_PAGE_SIZE:
+            raise ValueError(f"El parámetro '{name}' debe estar entre 1 y {self.MAX_PAGE_SIZE}")
+        return limit
+
+    def _check_search_radius(self, radius_km: float, name: str) -> None:
+        """ """
+        if not 0 < radius_km <= self.MAX_SEARCH_RADIUS_KM:
+            raise ValueError(f"El parámetro '{name}' debe ser mayor a 0 y hasta {self.MAX_SEARCH_RADIUS_KM:g} km")
+
+    @staticmethod
+    def _client_with_distance(cliente, distance: float) -> dict:
+        """ """
+        data = cliente.to_dict()
+        data['distancia_km'] = round(distance, 3)
         return data
 
-    @lru_cache(maxsize=100)
     def geocode_address(self, address: str) -> dict:
         """
         Convierte una dirección en coordenadas geográficas usando Google Maps API.
         Utiliza caché para evitar llamadas repetidas con la misma dirección.
+
+        Si la API no se puede usar (cuota agotada, circuito abierto o error del servicio)
+        se buscan las coordenadas de un cliente guardado con esa dirección; si tampoco hay,
+        devuelve {'error_type': MAPS_UNAVAILABLE_ERROR} para poder replanificar al cliente.
+        Ese rechazo no se recuerda: la próxima llamada vuelve a intentar.
+
+        Returns:
+            dict: 'latitude', 'longitude' y 'formatted_address'; vacío si la API no encontró
+                  la dirección
+        """
+        cache_key = address.strip().lower()
+        if cache_key in self._geocoded:
+            return self._geocoded[cache_key]
+
+        result = self._read_cache(self.maps_cache.get_geocode, cache_key)
+        if not result and self.maps_quota.acquire():
+            result = self._geocode_with_api(address, cache_key)
+        elif not result:
+            logger.warning("Geocodificación omitida: cuota de Google Maps agotada o circuito abierto")
+
+        if result is None:
+            result = self._read_cache(self.repository.get_coordinates_by_address, address.strip())
+            if not result:
+                return {'error_type': MAPS_UNAVAILABLE_ERROR}
+
+        self._geocoded[cache_key] = result
+        return result
+
+    def _geocode_with_api(self, address: str, cache_key: str) -> dict | None:
+        """
+        Consulta la API de geocodificación.
+
+        Returns:
+            dict | None: Coordenadas, {} si la dirección no existe o None si falló el servicio
         """
         try:
-            url = f"https://maps.googleapis.com/maps/api/geocode/json?address={address}&key={self.goole_maps_api_key}"
-            response = requests.get(url)
+            url = f"{self.maps_base_url}/maps/api/geocode/json?address={address}&key={self.goole_maps_api_key}"
+            response = requests.get(url, timeout=self.maps_timeout)
             data = response.json()
 
             if data['status'] == 'OK':
+                self.maps_quota.record_success()
                 location = data['results'][0]['geometry']['location']
-                return {
+                result = {
                     'latitude': location['lat'],
                     'longitude': location['lng'],
                     'formatted_address': data['results'][0]['formatted_address']
                 }
+                self._write_cache(self.maps_cache.save_geocode, cache_key, result)
+                return result
             else:
                 logger.error(f"Error geocoding address: {data['status']}")
+                if data['status'] in SERVICE_ERROR_STATUSES:
+                    self.maps_quota.record_failure(data['status'])
+                    return None
                 return {}
         except Exception as e:
+            self.maps_quota.record_failure(str(e))
             logger.error(f"Exception during geocoding: {str(e)}")
-            return {}
-
+            return None
 
     def calculate_travel_time(self, origin: str, destination: str, consider_traffic: bool = True):
         """
@@ -104,7 +307,15 @@ class Logistica:
                 - duration_in_traffic_text: Tiempo formateado considerando tráfico (ej.: "45 minutos")
                 - distance_meters: Distancia en metros
                 - distance_text: Distancia formateada (ej.: "5.2 km")
+                - estimated: True si el tiempo se estimó sin la API (cuota agotada, circuito abierto o error)
         """
+        cached = self._cached_travel_time(origin, destination)
+        if cached:
+            return cached
+
+        if not self.maps_quota.acquire():
+            return self._estimate_travel_time(origin, destination)
+
         try:
             # Parámetros base
             params = {
@@ -120,9 +331,9 @@ class Logistica:
             
             # Construir la URL con los parámetros
             url_params = "&".join([f"{k}={v}" for k, v in params.items()])
-            url = f"https://maps.googleapis.com/maps/api/distancematrix/json?{url_params}"
+            url = f"{self.maps_base_url}/maps/api/distancematrix/json?{url_params}"
             
-            response = requests.get(url)
+            response = requests.get(url, timeout=self.maps_timeout)
             data = response.json()
             
             if data['status'] == 'OK' and data['rows'][0]['elements'][0]['status'] == 'OK':
@@ -139,18 +350,131 @@ class Logistica:
                     result["duration_in_traffic_seconds"] = element['duration_in_traffic']['value']
                     result["duration_in_traffic_text"] = element['duration_in_traffic']['text']
                 
-                logger.info(f"Tiempo de viaje calculado: {result['duration_text']} " + 
-                           (f"(con tráfico: {result['duration_in_traffic_text']})" if consider_traffic and 'duration_in_traffic_text' in result else ""))
+                self.maps_quota.record_success(origin, destination, result['duration_seconds'])
+                self._pending_travel_times[(normalize_coordinates(origin), normalize_coordinates(destination))] = result
+
+                # Se llama una vez por par de puntos: el resumen por localidad lo emite el optimizador
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Tiempo de viaje calculado: {result['duration_text']} " +
+                                 (f"(con tráfico: {result['duration_in_traffic_text']})" if consider_traffic and 'duration_in_traffic_text' in result else ""))
                 return result
             else:
                 status = data.get('status', 'Unknown error')
                 element_status = data.get('rows', [{}])[0].get('elements', [{}])[0].get('status', 'Unknown error') if data.get('rows') else 'No data'
+                if status in SERVICE_ERROR_STATUSES:
+                    self.maps_quota.record_failure(status)
                 logger.error(f"Error calculating travel time: API status: {status}, Element status: {element_status}")
-                return None
+                return self._estimate_travel_time(origin, destination)
         except Exception as e:
+            self.maps_quota.record_failure(str(e))
             logger.error(f"Exception during travel time calculation: {str(e)}")
+            return self._estimate_travel_time(origin, destination)
+
+    def fetch_travel_times(self, origin: str, destinations: list[str]) -> dict:
+        """
+        Consulta en una sola llamada a Distance Matrix los tiempos desde un origen a
+        varios destinos (hasta 25) y los guarda en la caché.
+
+        Args:
+            origin (str): Coordenadas de origen "latitud,longitud"
+            destinations (list): Coordenadas de destino
+
+        Returns:
+            dict: {destino: resultado} solo con los pares resueltos por la API
+        """
+        if not destinations or not self.maps_quota.acquire(len(destinations)):
+            return {}
+
+        try:
+            url = (
+                f"{self.maps_base_url}/maps/api/distancematrix/json"
+                f"?origins={origin}&destinations={'|'.join(destinations)}&key={self.goole_maps_api_key}"
+            )
+            response = requests.get(url, timeout=self.maps_timeout)
+            data = response.json()
+
+            if data['status'] != 'OK':
+                if data['status'] in SERVICE_ERROR_STATUSES:
+                    self.maps_quota.record_failure(data['status'])
+                logger.error(f"Error fetching travel matrix: API status: {data['status']}")
+                return {}
+
+            results = {}
+            for destination, element in zip(destinations, data['rows'][0]['elements']):
+                if element['status'] == 'OK':
+                    results[destination] = {
+                        "distance_meters": element['distance']['value'],
+                        "distance_text": element['distance']['text'],
+                        "duration_seconds": element['duration']['value'],
+                        "duration_text": element['duration']['text']
+                    }
+            self.maps_quota.record_success()
+        except Exception as e:
+            self.maps_quota.record_failure(str(e))
+            logger.error(f"Exception during travel matrix fetch: {str(e)}")
+            return {}
+
+        self._write_cache(self.maps_cache.save_travel_times, {
+            (normalize_coordinates(origin), normalize_coordinates(destination)): result
+            for destination, result in results.items()
+        })
+        return results
+
+    def _cached_travel_time(self, origin: str, destination: str):
+        """Tiempo de viaje vigente guardado en la caché, o None."""
+        try:
+            origin_key = normalize_coordinates(origin)
+            destination_key = normalize_coordinates(destination)
+        except ValueError:
+            return None
+        pending = self._pending_travel_times.get((origin_key, destination_key))
+        if pending:
+            return pending
+        return self._read_cache(
+            self.maps_cache.get_travel_time,
+            origin_key,
+            destination_key,
+            utcnow() - self.travel_cache_ttl
+        )
+
+    @staticmethod
+    def _read_cache(read_func, *args):
+        """Lee la caché; si la base no está disponible, se sigue sin caché."""
+        try:
+            return read_func(*args)
+        except Exception as e:
+            logger.warning(f"No se pudo leer la caché de Google Maps: {str(e)}")
+            return None
+
+    def flush_travel_cache(self):
+        """Guarda en la caché, en una sola escritura, los tiempos de viaje pendientes."""
+        pending, self._pending_travel_times = self._pending_travel_times, {}
+        self._write_cache(self.maps_cache.save_travel_times, pending)
+
+    @staticmethod
+    def _write_cache(write_func, *args):
+        """Escribe en la caché sin interrumpir el cálculo si la base falla."""
+        try:
+            write_func(*args)
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"No se pudo guardar en la caché de Google Maps: {str(e)}")
+
+    def _estimate_travel_time(self, origin: str, destination: str):
+        """
+        Estima el tiempo de viaje por distancia cuando no se puede usar la API, para que
+        el cliente no quede fuera del plan. El resultado queda marcado con 'estimated'.
+        """
+        try:
+            return self.maps_quota.estimate_travel_time(origin, destination)
+        except Exception as e:
+            logger.error(f"Exception during travel time estimation: {str(e)}")
             return None
 
+    def maps_quota_status(self) -> dict:
+        """Devuelve el uso diario de Google Maps y el estado del circuito."""
+        return self.maps_quota.status()
+
     def create_optimized_routes(self, clients: list[dict]) -> dict:
         """
         Crea rutas optimizadas para visitar clientes, agrupados por ciudad.
@@ -173,78 +497,276 @@ class Logistica:
         except Exception as e:
             logger.error(f"Error al crear rutas optimizadas: {str(e)}")
             return {}
+        finally:
+            self.flush_travel_cache()
 
-    @staticmethod
-    def csv_to_user_dict(csv_file_path: str, user_key_field: str = "email") -> list[dict]:
+    def simulate_routes(self, routes: dict) -> dict:
         """
-        Convierte un archivo CSV en una lista de diccionarios donde cada elemento representa un usuario.
+        Estima la probabilidad de cumplir un plan de rutas ante variaciones de tráfico e instalación.
 
-        Args:
-            csv_file_path (str): Ruta al archivo CSV
-            user_key_field (str): Campo que se usará como clave para identificar a cada usuario (por defecto: "email")
+        Parámetros:
+        - routes: Plan devuelto por create_optimized_routes
 
-        Returns:
-            list: Lista de diccionarios donde cada diccionario contiene los datos de un usuario
+        Retorna:
+        - Un diccionario con el riesgo de horas extra por ruta y la probabilidad de llegar a tiempo por parada
+
+        Lanza ValueError si el plan está mal formado o supera SIMULATION_MAX_STOPS paradas.
+        """
+        try:
+            return self.route_simulator.simulate(routes)
+        except ValueError:
+            raise
+        except Exception as e:
+            logger.error(f"Error al simular rutas: {str(e)}")
+            return {}
+
+    def save_route_plan(self, routes: dict, fecha: date, client_key_field: str = "email",
+                        origen: str = "csv") -> dict | None:
+        """
+        Guarda un plan de rutas para poder consultarlo sin volver a optimizar.
+
+        Cada ruta '{localidad}_ruta_{n}' se agenda desde el n-ésimo día hábil (lunes a viernes)
+        a partir de 'fecha', siempre después de la ruta anterior de su localidad. Cada técnico
+        de TECNICOS recibe a lo sumo una ruta por día: si ese día no queda ninguno libre, la
+        ruta pasa al siguiente día hábil con un técnico libre. Solo quedan sin técnico (y se
+        informan) las rutas que no encuentran lugar en PLAN_HORIZON_DAYS días hábiles.
+
+        Parámetros:
+        - routes: Plan devuelto por create_optimized_routes
+        - fecha: Primer día del plan
+        - client_key_field: Campo que identifica a cada cliente
+        - origen: 'csv' o 'db'
+
+        Retorna:
+        - {'plan_id': id del plan, 'rutas_sin_tecnico': [claves de ruta]}, o None si no hay
+          rutas para guardar o no se pudo guardar
         """
         try:
+            plan_routes = []
+            for route_key, clients in routes.items():
+                if route_key == "usuarios_con_errores" or not clients:
+                    continue
 
-            with open(csv_file_path, 'rb') as raw_file:
-                result = chardet.detect(raw_file.read())
-                encoding = result['encoding']
-                confidence = result['confidence']
+                locality, _, day = route_key.rpartition("_ruta_")
+                plan_routes.append({
+                    'route_key': route_key,
+                    'localidad': locality,
+                    'fecha': None,
+                    'tecnico': None,
+                    'depot': clients[0].get('depot'),
+                    'start_time': self.route_optimizer.work_start,
+                    'end_time': clients[-1].get('estimated_completion'),
+                    'stops': [
+                        self._plan_stop_row(client, order, client_key_field)
+                        for order, client in enumerate(clients, 1)
+                    ]
+                })
 
-            logger.info(f"Codificación detectada: {encoding} (confianza: {confidence:.2f})")
+            if not plan_routes:
+                logger.warning("Plan de rutas sin rutas: no se guarda")
+                return None
+
+            unassigned = self._schedule_routes(plan_routes, fecha)
+
+            plan = {
+                'fecha': fecha,
+                'origen': origen,
+                'total_rutas': len(plan_routes),
+                'total_paradas': sum(len(route['stops']) for route in plan_routes),
+                'rutas_sin_tecnico': len(unassigned)
+            }
+            plan_id = self.plan_repository.save_plan(plan, plan_routes)
+            if unassigned:
+                logger.warning(
+                    f"Plan {plan_id}: {len(unassigned)} rutas sin técnico en {self.PLAN_HORIZON_DAYS} días hábiles",
+                    extra={"rutas_sin_tecnico": unassigned}
+                )
+            return {'plan_id': plan_id, 'rutas_sin_tecnico': unassigned}
+        except Exception as e:
+            logger.error(f"Error al guardar el plan de rutas: {str(e)}")
+            return None
 
-            # Lista de codificaciones a probar si la detección automática falla
-            encodings_to_try = [encoding, 'latin-1', 'iso-8859-1', 'windows-1252', 'utf-8']
-
-            user_list = []
-            success = False
-
-            # Intentar con diferentes codificaciones hasta que una funcione
-            for enc in encodings_to_try:
-                try:
-                    with open(csv_file_path, 'r', encoding=enc) as csv_file:
-                        csv_reader = csv.DictReader(csv_file, delimiter=';')
-
-                        for row in csv_reader:
-                            # Verificar si el campo clave existe en la fila
-                            if user_key_field not in row:
-                                logger.warning(f"El campo '{user_key_field}' no existe en la fila: {row}")
-                                # Intentar usar el primer campo como clave si el campo especificado no existe
-                                if len(row) > 0:
-                                    first_key = list(row.keys())[0]
-                                    user_key = row[first_key]
-                                    logger.warning(f"Usando '{first_key}' como clave alternativa: {user_key}")
-                                else:
-                                    continue
-                            else:
-                                user_key = row[user_key_field]
-
-                            # Si la clave está vacía, generar una clave única
-                            if not user_key or user_key.strip() == "":
-                                user_key = f"usuario_{len(user_list) + 1}"
-                                logger.warning(f"Clave vacía, generando clave automática: {user_key}")
-                                row[user_key_field] = user_key
-
-                            # Añadir el diccionario de usuario a la lista
-                            user_list.append(row)
-
-                    success = True
-                    logger.info(f"CSV procesado correctamente con codificación: {enc}")
+    def _schedule_routes(self, plan_routes: list[dict], start: date) -> list[str]:
+        """
+        Completa 'fecha' y 'tecnico' de cada ruta, con a lo sumo una ruta por técnico y por día.
+
+        Las rutas se ubican en orden (todas las primeras rutas, luego las segundas, ...) en
+        el primer día hábil con un técnico libre, a partir de su día nominal y del día
+        siguiente a la ruta anterior de su localidad. Un técnico está ocupado si ya tiene
+        ruta ese día en este plan o en el plan vigente de una localidad que este plan no
+        reemplaza ese día.
+
+        Returns:
+            list: Claves de las rutas sin técnico (se guardan en su día nominal)
+        """
+        def route_number(route):
+            day = route['route_key'].rpartition("_ruta_")[2]
+            return int(day) - 1 if day.isdigit() else 0
+
+        assigned = {}        # día hábil -> técnicos con ruta de este plan
+        localities_by_day = {}  # día hábil -> localidades que este plan agenda ese día
+        next_day = {}        # localidad -> primer día hábil libre para su próxima ruta
+        unassigned = []
+
+        for route in sorted(plan_routes, key=route_number):
+            nominal = route_number(route)
+            locality = route['localidad']
+            first_day = max(nominal, next_day.get(locality, 0))
+            horizon = self.PLAN_HORIZON_DAYS if self.plan_technicians else 0
+
+            for day in range(first_day, first_day + horizon):
+                if len(assigned.get(day, ())) >= len(self.plan_technicians):
+                    continue
+                route_date = self._add_working_days(start, day)
+                replanned = localities_by_day.get(day, set()) | {
+                    stop['localidad'] for stop in route['stops']
+                }
+                busy = assigned.get(day, set()) | self.plan_repository.get_busy_technicians(
+                    route_date, list(replanned)
+                )
+                technician = next((name for name in self.plan_technicians if name not in busy), None)
+                if technician:
+                    route['fecha'] = route_date
+                    route['tecnico'] = technician
+                    assigned.setdefault(day, set()).add(technician)
+                    localities_by_day[day] = replanned
+                    next_day[locality] = day + 1
                     break
+            else:
+                route['fecha'] = self._add_working_days(start, nominal)
+                unassigned.append(route['route_key'])
+
+        return unassigned
+
+    def get_route_plan(self, plan_id: int) -> dict | None:
+        """Devuelve un plan guardado con sus rutas y paradas."""
+        plan = self.plan_repository.get_plan(plan_id)
+        if plan is None:
+            return None
+
+        stops_by_route = {}
+        for stop in self.plan_repository.get_plan_stops(plan_id):
+            stops_by_route.setdefault(stop['route_key'], []).append(stop)
+
+        return {
+            **plan.to_dict(),
+            'rutas': [
+                {**route.to_dict(), 'paradas': stops_by_route.get(route.route_key, [])}
+                for route in plan.routes
+            ]
+        }
 
-                except UnicodeDecodeError:
-                    logger.warning(f"No se pudo decodificar el archivo con codificación: {enc}")
+    def get_technician_stops(self, tecnico: str, fecha: date) -> list[dict]:
+        """Devuelve las paradas de un técnico para una fecha, en orden de visita."""
+        return self.plan_repository.get_technician_stops(tecnico, fecha)
+
+    def get_locality_plan(self, localidad: str, fecha: date) -> dict:
+        """Devuelve las paradas de una localidad para una fecha, agrupadas por ruta."""
+        routes = {}
+        locality = self.route_optimizer.normalize_locality(localidad)
+        for stop in self.plan_repository.get_locality_stops(locality, fecha):
+            routes.setdefault(stop['route_key'], []).append(stop)
+        return routes
+
+    def get_next_visit(self, cliente_id: str, desde: date) -> dict | None:
+        """Devuelve la próxima parada planificada de un cliente."""
+        return self.plan_repository.get_next_visit(cliente_id, desde)
+
+    def _plan_stop_row(self, client: dict, order: int, client_key_field: str) -> dict:
+        """Arma las columnas de PlanStop a partir de un cliente de la ruta."""
+        client_key = client.get(client_key_field, client.get('id'))
+        return {
+            'orden': order,
+            'localidad': self.route_optimizer.normalize_locality(client.get('Localidad')),
+            'cliente_id': str(client_key) if client_key not in (None, '') else None,
+            'domicilio': client.get('Domicilio'),
+            'coordinates': client.get('coordinates'),
+            'estimated_arrival': client.get('estimated_arrival'),
+            'estimated_completion': client.get('estimated_completion'),
+            'travel_time': client.get('travel_time'),
+            'installation_time': client.get('installation_time'),
+            'travel_time_estimated': bool(client.get('travel_time_estimated')),
+            'datos': client
+        }
+
+    @staticmethod
+    def _add_working_days(start: date, days: int) -> date:
+        """Suma días hábiles (lunes a viernes) a una fecha."""
+        current = start
+        while current.weekday() >= 5:
+            current += timedelta(days=1)
+        while days > 0:
+            current += timedelta(days=1)
+            if current.weekday() < 5:
+                days -= 1
+        return current
+
+    @staticmethod
+    def iter_user_rows(file_path: str, user_key_field: str = "email", encoding: str | None = None):
+        """
+        Recorre los usuarios de un archivo CSV, CSV comprimido (.gz/.zip) o Excel (.xlsx)
+        sin cargarlo completo en memoria.
+
+        Args:
+            file_path (str): Ruta al archivo
+            user_key_field (str): Campo que se usará como clave para identificar a cada usuario (por defecto: "email")
+            encoding (str): Codificación del texto; si no se indica se detecta con una muestra del archivo
+
+        Yields:
+            dict: Datos de un usuario, con el mismo formato que devuelve csv_to_user_dict
+        """
+        if encoding is None and upload_format(file_path) != "xlsx":
+            encoding, confidence = detect_encoding(file_path)
+            logger.info(f"Codificación detectada: {encoding} (confianza: {confidence:.2f})")
+
+        for count, row in enumerate(iter_rows(file_path, encoding), start=1):
+            # Verificar si el campo clave existe en la fila
+            if user_key_field not in row:
+                logger.warning(f"El campo '{user_key_field}' no existe en la fila: {row}")
+                # Intentar usar el primer campo como clave si el campo especificado no existe
+                if len(row) > 0:
+                    first_key = list(row.keys())[0]
+                    user_key = row[first_key]
+                    logger.warning(f"Usando '{first_key}' como clave alternativa: {user_key}")
+                else:
                     continue
+            else:
+                user_key = row[user_key_field]
+
+            # Si la clave está vacía, generar una clave única
+            if not user_key or user_key.strip() == "":
+                user_key = f"usuario_{count}"
+                logger.warning(f"Clave vacía, generando clave automática: {user_key}")
+                row[user_key_field] = user_key
+
+            yield row
+
+    @staticmethod
+    def csv_to_user_dict(csv_file_path: str, user_key_field: str = "email") -> list[dict]:
+        """
+        Convierte un archivo CSV en una lista de diccionarios donde cada elemento representa un usuario.
+
+        También acepta CSV comprimidos (.csv.gz, .gz, .zip con un CSV) y planillas .xlsx. El
+        archivo se lee una sola vez: la codificación se detecta con una muestra y los bytes que
+        no la respetan se leen como Windows-1252.
 
-            if not success:
-                logger.error("No se pudo procesar el archivo CSV con ninguna codificación")
-                return []
+        Args:
+            csv_file_path (str): Ruta al archivo CSV
+            user_key_field (str): Campo que se usará como clave para identificar a cada usuario (por defecto: "email")
 
-            logger.info(f"CSV convertido a lista: {len(user_list)} usuarios procesados")
+        Returns:
+            list: Lista de diccionarios donde cada diccionario contiene los datos de un usuario
+
+        Raises:
+            ValueError: Si el archivo está dañado o es un ZIP sin ningún CSV
+        """
+        try:
+            user_list = list(Logistica.iter_user_rows(csv_file_path, user_key_field))
+            logger.info(f"Archivo convertido a lista: {len(user_list)} usuarios procesados")
             return user_list
 
+        except ValueError:
+            raise
         except FileNotFoundError:
             logger.error(f"No se encontró el archivo CSV: {csv_file_path}")
             return []
@@ -0,0 +1,302 @@
+"""
+Módulo para administrar la cuota de Google Maps compartida entre workers.
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+from app.utils.geo import geohash_encode, haversine_km, parse_coordinates
+from app.utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+# Estados de la API que indican un problema del servicio (y no de la dirección consultada)
+SERVICE_ERROR_STATUSES = ("OVER_QUERY_LIMIT", "OVER_DAILY_LIMIT", "REQUEST_DENIED", "UNKNOWN_ERROR")
+
+# error_type de los clientes que no se pudieron ubicar porque la API no estaba disponible
+# (cuota agotada, circuito abierto o error del servicio): se pueden volver a planificar
+MAPS_UNAVAILABLE_ERROR = "cuota_maps"
+
+_schema_lock = threading.Lock()
+_initialized_paths = set()
+
+
+class MapsQuotaManager:
+    """
+    Clase para controlar el presupuesto diario de elementos de Google Maps y cortar
+    las consultas (circuit breaker) ante ráfagas de errores.
+
+    El estado vive en un archivo SQLite local, así todos los workers de gunicorn
+    comparten el mismo contador. Mientras no se puede consultar la API, los tiempos
+    de viaje se estiman con la distancia haversine y una velocidad calibrada por zona.
+    """
+
+    # Precisión geohash de las zonas de calibración (~39 km x 20 km)
+    SPEED_AREA_PRECISION = 4
+    # Peso de cada nueva observación en el promedio móvil de velocidad
+    SPEED_SMOOTHING = 0.1
+
+    def __init__(self, db_path, daily_element_budget=20000, breaker_errors=5, breaker_window_s=60,
+                 breaker_cooldown_s=300, default_speed_kmh=35.0):
+        """
+        Constructor del administrador de cuota.
+
+        Args:
+            db_path: Ruta del archivo SQLite compartido
+            daily_element_budget: Elementos de la API permitidos por día (UTC)
+            breaker_errors: Errores dentro de la ventana que abren el circuito
+            breaker_window_s: Duración de la ventana de errores (segundos)
+            breaker_cooldown_s: Tiempo que el circuito queda abierto (segundos)
+            default_speed_kmh: Velocidad en línea recta usada en zonas sin calibrar
+        """
+        self.db_path = db_path
+        self.daily_element_budget = daily_element_budget
+        self.breaker_errors = breaker_errors
+        self.breaker_window_s = breaker_window_s
+        self.breaker_cooldown_s = breaker_cooldown_s
+        self.default_speed_kmh = default_speed_kmh
+        self._init_schema()
+
+    @classmethod
+    def from_env(cls):
+        """Crea el administrador con la configuración de las variables de entorno."""
+        return cls(
+            db_path=os.getenv("MAPS_QUOTA_DB", os.path.join(tempfile.gettempdir(), "maps_quota.sqlite3")),
+            daily_element_budget=int(os.getenv("MAPS_DAILY_ELEMENT_BUDGET", "20000")),
+            breaker_errors=int(os.getenv("MAPS_BREAKER_ERRORS", "5")),
+            breaker_window_s=float(os.getenv("MAPS_BREAKER_WINDOW_S", "60")),
+            breaker_cooldown_s=float(os.getenv("MAPS_BREAKER_COOLDOWN_S", "300")),
+            default_speed_kmh=float(os.getenv("MAPS_DEFAULT_SPEED_KMH", "35"))
+        )
+
+    def acquire(self, elements=1):
+        """
+        Reserva elementos del presupuesto diario si el circuito está cerrado.
+
+        Args:
+            elements: Cantidad de elementos que usará la consulta
+
+        Returns:
+            True si se puede consultar la API, False si hay que usar el modo degradado
+            (también si el archivo de estado no está disponible, por ejemplo bloqueado)
+        """
+        if not self._init_schema():
+            return False
+        try:
+            return self._acquire(elements)
+        except sqlite3.Error as e:
+            logger.warning(f"No se pudo leer la cuota de Google Maps, se usa el modo degradado: {str(e)}")
+            return False
+
+    def _acquire(self, elements):
+        """ """
+        now = time.time()
+        today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            open_until = conn.execute("SELECT open_until FROM breaker WHERE id = 1").fetchone()[0]
+            if open_until > now:
+                conn.execute("COMMIT")
+                return False
+
+            row = conn.execute("SELECT elements FROM usage WHERE day = ?", (today,)).fetchone()
+            used = row[0] if row else 0
+            if used + elements > self.daily_element_budget:
+                conn.execute("COMMIT")
+                return False
+
+            conn.execute(
+                "INSERT INTO usage (day, elements) VALUES (?, ?) "
+                "ON CONFLICT(day) DO UPDATE SET elements = elements + excluded.elements",
+                (today, elements)
+            )
+            conn.execute("COMMIT")
+            return True
+
+    def record_success(self, origin=None, destination=None, duration_seconds=None):
+        """
+        Registra una respuesta correcta: si hay datos de viaje, calibra la velocidad de la
+        zona de origen.
+
+        No reinicia el conteo de errores: el circuito cuenta todos los errores de la ventana,
+        así una ráfaga con respuestas correctas intercaladas también lo abre.
+        """
+        if not (origin and destination and duration_seconds):
+            return
+        distance_km = haversine_km(*parse_coordinates(origin), *parse_coordinates(destination))
+        if distance_km <= 0.5:
+            return
+        speed_kmh = distance_km / (duration_seconds / 3600)
+
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT INTO speeds (area, kmh, samples) VALUES (?, ?, 1) "
+                    "ON CONFLICT(area) DO UPDATE SET "
+                    "kmh = kmh + ? * (excluded.kmh - kmh), samples = samples + 1",
+                    (self._area(origin), speed_kmh, self.SPEED_SMOOTHING)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"No se pudo calibrar la velocidad de la zona: {str(e)}")
+
+    def record_failure(self, reason):
+        """
+        Registra un error del servicio y abre el circuito si se supera el umbral.
+
+        Args:
+            reason: Estado de la API o descripción de la excepción
+        """
+        try:
+            self._record_failure(reason)
+        except sqlite3.Error as e:
+            logger.warning(f"No se pudo registrar el error de Google Maps ({reason}): {str(e)}")
+
+    def _record_failure(self, reason):
+        """ """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            window_start, failures = conn.execute(
+                "SELECT window_start, failures FROM breaker WHERE id = 1"
+            ).fetchone()
+            if now - window_start > self.breaker_window_s:
+                window_start, failures = now, 0
+            failures += 1
+
+            opened = failures >= self.breaker_errors
+            conn.execute(
+                "UPDATE breaker SET window_start = ?, failures = ?, "
+                "open_until = CASE WHEN ? THEN ? ELSE open_until END WHERE id = 1",
+                (window_start, 0 if opened else failures, opened, now + self.breaker_cooldown_s)
+            )
+            conn.execute("COMMIT")
+
+        if opened:
+            logger.warning(
+                f"Circuito de Google Maps abierto por {self.breaker_cooldown_s:.0f}s "
+                f"tras {failures} errores (último: {reason})"
+            )
+
+    def estimate_travel_time(self, origin, destination):
+        """
+        Estima el tiempo de viaje sin consultar la API.
+
+        Args:
+            origin: Coordenadas de origen "latitud,longitud"
+            destination: Coordenadas de destino "latitud,longitud"
+
+        Returns:
+            dict: Mismo formato que Logistica.calculate_travel_time, con 'estimated' en True
+        """
+        distance_km = haversine_km(*parse_coordinates(origin), *parse_coordinates(destination))
+        duration_seconds = int(distance_km / self._speed_kmh(origin) * 3600)
+        return {
+            "distance_meters": int(distance_km * 1000),
+            "distance_text": f"{distance_km:.1f} km",
+            "duration_seconds": duration_seconds,
+            "duration_text": f"{round(duration_seconds / 60)} min",
+            "estimated": True
+        }
+
+    def status(self):
+        """
+        Devuelve el uso del día y el estado del circuito.
+
+        Si el archivo de estado no está disponible devuelve el motivo en 'error': mientras
+        tanto acquire() rechaza las consultas y se trabaja en modo degradado.
+        """
+        today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        unavailable = {
+            "dia": today,
+            "presupuesto_diario": self.daily_element_budget,
+            "error": f"Estado de la cuota no disponible ({self.db_path}): se usa el modo degradado"
+        }
+        if not self._init_schema():
+            return unavailable
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT elements FROM usage WHERE day = ?", (today,)).fetchone()
+                open_until = conn.execute("SELECT open_until FROM breaker WHERE id = 1").fetchone()[0]
+                calibrated_areas = conn.execute("SELECT COUNT(*) FROM speeds").fetchone()[0]
+        except sqlite3.Error as e:
+            logger.warning(f"No se pudo leer el estado de la cuota de Google Maps: {str(e)}")
+            return unavailable
+
+        return {
+            "dia": today,
+            "elementos_usados": row[0] if row else 0,
+            "presupuesto_diario": self.daily_element_budget,
+            "circuito_abierto": open_until > time.time(),
+            "zonas_calibradas": calibrated_areas
+        }
+
+    def _speed_kmh(self, origin):
+        """Velocidad calibrada de la zona de origen, o la velocidad por defecto."""
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT kmh FROM speeds WHERE area = ?", (self._area(origin),)).fetchone()
+        except sqlite3.Error:
+            row = None
+        return row[0] if row and row[0] > 0 else self.default_speed_kmh
+
+    def _area(self, coordinates):
+        """ """
+        return geohash_encode(*parse_coordinates(coordinates), self.SPEED_AREA_PRECISION)
+
+    def _connect(self):
+        """Abre una conexión en modo autocommit; las transacciones se manejan a mano."""
+        return _Connection(self.db_path)
+
+    def _init_schema(self):
+        """
+        Crea las tablas una vez por proceso y archivo.
+
+        Returns:
+            True si el esquema está listo; False si el archivo no se pudo abrir o está
+            bloqueado (se reintenta en la próxima llamada)
+        """
+        with _schema_lock:
+            if self.db_path in _initialized_paths:
+                return True
+            try:
+                self._create_tables()
+            except sqlite3.Error as e:
+                logger.warning(f"No se pudo inicializar la cuota de Google Maps en {self.db_path}: {str(e)}")
+                return False
+            _initialized_paths.add(self.db_path)
+            return True
+
+    def _create_tables(self):
+        """ """
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS usage (day TEXT PRIMARY KEY, elements INTEGER NOT NULL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS breaker (id INTEGER PRIMARY KEY CHECK (id = 1), "
+                "window_start REAL NOT NULL, failures INTEGER NOT NULL, open_until REAL NOT NULL)"
+            )
+            conn.execute("INSERT OR IGNORE INTO breaker (id, window_start, failures, open_until) VALUES (1, 0, 0, 0)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS speeds (area TEXT PRIMARY KEY, kmh REAL NOT NULL, samples INTEGER NOT NULL)"
+            )
+
+
+class _Connection:
+    """Context manager que abre y cierra una conexión SQLite, revirtiendo si hay errores."""
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path, timeout=5, isolation_level=None)
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and self.conn.in_transaction:
+            self.conn.execute("ROLLBACK")
+        self.conn.close()
+        return False
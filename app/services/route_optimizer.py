@@ -1,7 +1,11 @@
 """
 Módulo para la optimización de rutas de clientes.
 """
-from app.utils.logger import get_logger
+import time
+
+from app.services.depots import DepotLocator
+from app.utils.geo import haversine_km, parse_coordinates
+from app.utils.logger import get_logger, LogAggregator
 
 
 logger = get_logger(__name__)
@@ -12,7 +16,8 @@ class RouteOptimizer:
     restricciones de tiempo, distancias y tipos de instalación.
     """
 
-    def __init__(self, google_maps_api_key, default_reference_point, installation_times, use_llm=False):
+    def __init__(self, google_maps_api_key, default_reference_point, installation_times, use_llm=False,
+                 depots=None):
         """
         Constructor para el optimizador de rutas.
         
@@ -21,9 +26,13 @@ class RouteOptimizer:
             default_reference_point: Punto de referencia inicial para las rutas (lat, lng)
             installation_times: Diccionario con tiempos de instalación según tipo
             use_llm: Si es True, utiliza un modelo LLM para optimizar las rutas
+            depots: Lista de depósitos ('nombre', 'coordinates'); por defecto solo el punto de referencia
         """
         self.google_maps_api_key = google_maps_api_key
         self.default_reference_point = default_reference_point
+        self.depot_locator = DepotLocator(
+            depots or [{'nombre': 'base', 'coordinates': default_reference_point}]
+        )
         self.installation_times = installation_times
         self.use_llm = use_llm
         
@@ -32,6 +41,14 @@ class RouteOptimizer:
         self.work_end = 18.0   # 6:00 PM
         self.lunch_break = 1.0  # 1 hora de almuerzo
         self.lunch_threshold = self.work_start + 4  # Umbral para almuerzo (4 horas después del inicio)
+
+        # Consolidación: localidades cuyos centroides están a menos de este radio se consideran vecinas
+        self.consolidation_radius_km = 40.0
+        # Solo se intenta reubicar rutas de a lo sumo esta cantidad de horas
+        self.consolidation_max_hours = (self.work_end - self.work_start) / 2
+
+        # Las consultas de tiempo de viaje se resumen en un único log por localidad
+        self.travel_log = LogAggregator()
     
     def optimize_routes(self, clients, geocode_func, travel_time_func):
         """
@@ -69,6 +86,12 @@ class RouteOptimizer:
                     
                     if clients_with_coords:
                         clients_by_locality_with_coords[locality] = clients_with_coords
+
+                    self.travel_log.flush(
+                        logger,
+                        f"Consultas de tiempo de viaje para {locality}",
+                        localidad=locality
+                    )
                 
                 # Usar el optimizador LLM con los clientes que tienen coordenadas
                 optimized_routes = self.llm_optimizer.optimize_routes_with_llm(clients_by_locality_with_coords)
@@ -87,6 +110,8 @@ class RouteOptimizer:
                 
                 # Resultado: rutas optimizadas por localidad
                 optimized_routes = {}
+                routes_by_locality = {}
+                locality_centroids = {}
                 all_geolocation_errors = initial_errors.copy() if initial_errors else []
                 
                 # Procesar cada localidad
@@ -109,8 +134,33 @@ class RouteOptimizer:
                         clients_with_coords, 
                         travel_time_func
                     )
-                    
-                    # Agregar rutas de esta localidad al resultado global con el formato requerido
+
+                    if locality_routes:
+                        routes_by_locality[locality] = locality_routes
+                        locality_centroids[locality] = self._centroid(clients_with_coords)
+
+                    self.travel_log.flush(
+                        logger,
+                        f"Consultas de tiempo de viaje para {locality}",
+                        localidad=locality,
+                        rutas=len(locality_routes)
+                    )
+
+                # Unir rutas con poca carga de localidades vecinas
+                routes_by_locality = self._consolidate_routes(
+                    routes_by_locality,
+                    locality_centroids,
+                    travel_time_func
+                )
+                self.travel_log.flush(
+                    logger,
+                    "Consultas de tiempo de viaje para la consolidación",
+                    localidad="consolidacion",
+                    rutas=sum(len(locality_routes) for locality_routes in routes_by_locality.values())
+                )
+                
+                # Agregar rutas de cada localidad al resultado global con el formato requerido
+                for locality, locality_routes in routes_by_locality.items():
                     for i, route in enumerate(locality_routes, 1):
                         route_key = f"{locality}_ruta_{i}"
                         optimized_routes[route_key] = route['clients']
@@ -139,14 +189,7 @@ class RouteOptimizer:
         
         for client in clients:
             # Determinar la localidad del cliente usando el campo 'Localidad'
-            locality = client.get('Localidad', 'sin_localidad').lower()
-            
-            # Si la localidad está vacía, usar 'sin_localidad'
-            if not locality or locality.strip() == "":
-                locality = 'sin_localidad'
-            
-            # Normalizar el nombre de la localidad para usar como clave
-            locality = locality.replace(" ", "_")
+            locality = self.normalize_locality(client.get('Localidad', 'sin_localidad'))
             
             if locality not in clients_by_locality:
                 clients_by_locality[locality] = []
@@ -155,10 +198,29 @@ class RouteOptimizer:
         
         return clients_by_locality, initial_errors
     
+    @staticmethod
+    def normalize_locality(locality):
+        """
+        Normaliza el nombre de una localidad para usarlo como clave de las rutas.
+
+        Args:
+            locality: Valor del campo 'Localidad'
+
+        Returns:
+            Nombre en minúsculas con guiones bajos, o 'sin_localidad' si está vacío
+        """
+        locality = (locality or '').lower()
+        
+        # Si la localidad está vacía, usar 'sin_localidad'
+        if locality.strip() == "":
+            return 'sin_localidad'
+        
+        return locality.replace(" ", "_")
+
     def _get_clients_with_coordinates(self, clients, geocode_func, travel_time_func):
         """
-        Obtiene las coordenadas geográficas de los clientes y los ordena por proximidad
-        al punto de referencia.
+        Obtiene las coordenadas geográficas de los clientes, asigna la localidad al
+        depósito más cercano y los ordena por proximidad a ese depósito.
         
         Args:
             clients: Lista de clientes de una localidad
@@ -166,38 +228,58 @@ class RouteOptimizer:
             travel_time_func: Función para calcular tiempo de viaje
             
         Returns:
-            Lista de clientes con coordenadas, ordenados por proximidad
+            Lista de clientes con coordenadas y 'depot', ordenados por proximidad
         """
-        clients_with_coords = []
+        geocoded_clients = []
         geolocation_errors = []
         
         for client in clients:
             try:
                 # Obtener coordenadas del cliente
-                address = client['Domicilio']
-                coords = geocode_func(address)
+                # Clientes cargados desde la base ya traen coordenadas: evitar geocodificar
+                coords = self._known_coordinates(client) or geocode_func(client['Domicilio'])
                 
                 if coords and 'latitude' in coords and 'longitude' in coords:
-                    client_coords = f"{coords['latitude']},{coords['longitude']}"
-                    
-                    # Calcular tiempo de viaje desde el punto de referencia
-                    travel_info = travel_time_func(self.default_reference_point, client_coords)
-                    
-                    if travel_info:
-                        # Guardar información relevante
-                        client_with_coords = client.copy()
-                        client_with_coords['coordinates'] = client_coords
-                        client_with_coords['travel_time_from_start'] = travel_info['duration_seconds'] / 3600  # Convertir a horas
-                        clients_with_coords.append(client_with_coords)
-                    else:
-                        # Error al calcular tiempo de viaje
-                        error_client = client.copy()
-                        error_client['error_type'] = 'error_calculo_tiempo_viaje'
-                        geolocation_errors.append(error_client)
+                    geocoded_clients.append((client, coords))
                 else:
-                    # Error en geocodificación
+                    # Error en geocodificación (o API no disponible: 'cuota_maps')
                     error_client = client.copy()
-                    error_client['error_type'] = 'error_geocodificacion'
+                    error_client['error_type'] = (coords or {}).get('error_type', 'error_geocodificacion')
+                    geolocation_errors.append(error_client)
+            except Exception as e:
+                # Error general
+                error_client = client.copy()
+                error_client['error_type'] = f'error_general: {str(e)}'
+                geolocation_errors.append(error_client)
+
+        if not geocoded_clients:
+            return [], geolocation_errors
+
+        # Toda la localidad sale del depósito más cercano a su centroide
+        depot = self.depot_locator.nearest(
+            sum(coords['latitude'] for _, coords in geocoded_clients) / len(geocoded_clients),
+            sum(coords['longitude'] for _, coords in geocoded_clients) / len(geocoded_clients)
+        )
+
+        clients_with_coords = []
+        for client, coords in geocoded_clients:
+            try:
+                client_coords = f"{coords['latitude']},{coords['longitude']}"
+                
+                # Calcular tiempo de viaje desde el depósito asignado
+                travel_info = self._travel_time(travel_time_func, depot['coordinates'], client_coords)
+                
+                if travel_info:
+                    # Guardar información relevante
+                    client_with_coords = client.copy()
+                    client_with_coords['coordinates'] = client_coords
+                    client_with_coords['depot'] = depot['nombre']
+                    client_with_coords['travel_time_from_start'] = travel_info['duration_seconds'] / 3600  # Convertir a horas
+                    clients_with_coords.append(client_with_coords)
+                else:
+                    # Error al calcular tiempo de viaje
+                    error_client = client.copy()
+                    error_client['error_type'] = 'error_calculo_tiempo_viaje'
                     geolocation_errors.append(error_client)
             except Exception as e:
                 # Error general
@@ -205,10 +287,38 @@ class RouteOptimizer:
                 error_client['error_type'] = f'error_general: {str(e)}'
                 geolocation_errors.append(error_client)
         
-        # Ordenar por tiempo de viaje desde el punto de referencia
+        # Ordenar por tiempo de viaje desde el depósito
         clients_with_coords.sort(key=lambda x: x['travel_time_from_start'])
         return clients_with_coords, geolocation_errors
     
+    def _route_start_point(self, clients):
+        """
+        Devuelve las coordenadas desde donde arranca cada día de la ruta.
+
+        Args:
+            clients: Lista de clientes con el depósito asignado
+
+        Returns:
+            Coordenadas del depósito de los clientes, o el punto de referencia por defecto
+        """
+        depot = self.depot_locator.by_name.get(clients[0].get('depot')) if clients else None
+        return depot['coordinates'] if depot else self.default_reference_point
+
+    @staticmethod
+    def _known_coordinates(client):
+        """
+        Devuelve las coordenadas del cliente si ya vienen cargadas ('latitud'/'longitud').
+
+        Returns:
+            Diccionario con 'latitude' y 'longitude', o None si no están disponibles
+        """
+        try:
+            latitude = float(client['latitud'])
+            longitude = float(client['longitud'])
+        except (KeyError, TypeError, ValueError):
+            return None
+        return {'latitude': latitude, 'longitude': longitude}
+
     def _create_city_routes(self, clients, travel_time_func):
         """
         Crea rutas optimizadas para una ciudad específica.
@@ -223,7 +333,8 @@ class RouteOptimizer:
         city_routes = []
         current_route = []
         current_time = self.work_start
-        current_location = self.default_reference_point
+        start_point = self._route_start_point(clients)
+        current_location = start_point
         day_counter = 1
         
         for client in clients:
@@ -255,7 +366,7 @@ class RouteOptimizer:
                     day_counter += 1
                     current_route = []
                     current_time = self.work_start
-                    current_location = self.default_reference_point
+                    current_location = start_point
                     
                     # Recalcular el tiempo de viaje desde el punto de inicio
                     travel_info, travel_time, _ = self._calculate_times(
@@ -272,6 +383,7 @@ class RouteOptimizer:
             
             # Agregar cliente a la ruta actual
             client_info = self._prepare_client_info(client, current_time, travel_time, installation_time)
+            client_info['travel_time_estimated'] = bool(travel_info.get('estimated'))
             current_route.append(client_info)
             
             # Actualizar tiempo y ubicación actuales
@@ -289,6 +401,152 @@ class RouteOptimizer:
         
         return city_routes
     
+    def _travel_time(self, travel_time_func, origin, destination):
+        """
+        Consulta el tiempo de viaje y acumula el resultado para el resumen de la localidad.
+
+        Args:
+            travel_time_func: Función para calcular tiempo de viaje
+            origin: Coordenadas de origen
+            destination: Coordenadas de destino
+
+        Returns:
+            El resultado de travel_time_func
+        """
+        started = time.perf_counter()
+        travel_info = travel_time_func(origin, destination)
+        elapsed = time.perf_counter() - started
+
+        if travel_info and travel_info.get('estimated'):
+            self.travel_log.add('estimated', latency_s=elapsed, duration_s=travel_info['duration_seconds'])
+        elif travel_info:
+            self.travel_log.add('ok', latency_s=elapsed, duration_s=travel_info['duration_seconds'])
+        else:
+            self.travel_log.add('error', latency_s=elapsed)
+        return travel_info
+
+    @staticmethod
+    def _centroid(clients):
+        """
+        Calcula el centroide de un grupo de clientes con coordenadas.
+
+        Args:
+            clients: Lista de clientes con 'coordinates'
+
+        Returns:
+            Tupla (latitud, longitud)
+        """
+        points = [parse_coordinates(client['coordinates']) for client in clients]
+        return (
+            sum(lat for lat, _ in points) / len(points),
+            sum(lng for _, lng in points) / len(points)
+        )
+
+    def _consolidate_routes(self, routes_by_locality, locality_centroids, travel_time_func):
+        """
+        Une rutas con poca carga a rutas de localidades vecinas cuando el día combinado
+        sigue entrando en el horario de trabajo, para usar menos días de técnico.
+
+        Args:
+            routes_by_locality: Diccionario {localidad: lista de rutas}
+            locality_centroids: Diccionario {localidad: (latitud, longitud)}
+            travel_time_func: Función para calcular tiempo de viaje
+
+        Returns:
+            Diccionario {localidad: lista de rutas} con las rutas consolidadas
+        """
+        neighbors = self._locality_neighbors(locality_centroids)
+        if not any(neighbors.values()):
+            return routes_by_locality
+
+        # Rutas candidatas a reubicar, de la más corta a la más larga
+        donors = sorted(
+            (
+                (locality, route)
+                for locality, routes in routes_by_locality.items()
+                for route in routes
+                if route['end_time'] - route['start_time'] <= self.consolidation_max_hours
+            ),
+            key=lambda item: item[1]['end_time'] - item[1]['start_time']
+        )
+
+        merged_count = 0
+        for donor_locality, donor in donors:
+            # La ruta pudo haber recibido clientes (y ser reemplazada) en una unión anterior
+            if not any(route is donor for route in routes_by_locality[donor_locality]):
+                continue
+            donor_work = sum(client['installation_time'] for client in donor['clients'])
+
+            for host_locality in neighbors[donor_locality]:
+                merged = self._merge_into_neighbor(
+                    routes_by_locality[host_locality],
+                    donor,
+                    donor_work,
+                    travel_time_func
+                )
+                if merged:
+                    routes_by_locality[donor_locality] = [
+                        route for route in routes_by_locality[donor_locality] if route is not donor
+                    ]
+                    merged_count += 1
+                    break
+
+        if merged_count:
+            logger.info(f"Consolidación: {merged_count} rutas unidas a localidades vecinas")
+
+        return {locality: routes for locality, routes in routes_by_locality.items() if routes}
+
+    def _locality_neighbors(self, locality_centroids):
+        """
+        Arma el grafo de adyacencia entre localidades según la distancia entre centroides.
+
+        Args:
+            locality_centroids: Diccionario {localidad: (latitud, longitud)}
+
+        Returns:
+            Diccionario {localidad: localidades vecinas ordenadas de la más cercana a la más lejana}
+        """
+        neighbors = {}
+        for locality, (lat, lng) in locality_centroids.items():
+            distances = [
+                (haversine_km(lat, lng, other_lat, other_lng), other)
+                for other, (other_lat, other_lng) in locality_centroids.items()
+                if other != locality
+            ]
+            neighbors[locality] = [
+                other for distance, other in sorted(distances)
+                if distance <= self.consolidation_radius_km
+            ]
+        return neighbors
+
+    def _merge_into_neighbor(self, host_routes, donor, donor_work, travel_time_func):
+        """
+        Intenta agregar los clientes de una ruta al final de alguna ruta vecina.
+
+        Args:
+            host_routes: Rutas de la localidad vecina (se modifican si la unión es posible)
+            donor: Ruta a reubicar
+            donor_work: Horas de instalación de la ruta a reubicar
+            travel_time_func: Función para calcular tiempo de viaje
+
+        Returns:
+            True si la ruta se unió a una ruta vecina, False en caso contrario
+        """
+        # Primero las rutas con más tiempo libre
+        for index, host in sorted(enumerate(host_routes), key=lambda item: item[1]['end_time']):
+            # El tiempo libre debe alcanzar al menos para las instalaciones
+            if self.work_end - host['end_time'] < donor_work:
+                continue
+
+            combined = host['clients'] + donor['clients']
+            routes = self._create_city_routes(combined, travel_time_func)
+            if len(routes) == 1 and len(routes[0]['clients']) == len(combined):
+                routes[0]['day'] = host['day']
+                host_routes[index] = routes[0]
+                return True
+
+        return False
+
     def _calculate_times(self, client, current_location, travel_time_func):
         """
         Calcula los tiempos de viaje e instalación para un cliente.
@@ -302,7 +560,7 @@ class RouteOptimizer:
             Tupla con (travel_info, travel_time, installation_time)
         """
         # Calcular tiempo de viaje desde la ubicación actual
-        travel_info = travel_time_func(current_location, client['coordinates'])
+        travel_info = self._travel_time(travel_time_func, current_location, client['coordinates'])
         
         if not travel_info:
             return None, 0, 0
@@ -0,0 +1,184 @@
+"""
+Módulo para simular la factibilidad de un plan de rutas con Monte Carlo.
+"""
+import math
+
+import numpy as np
+
+from app.utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+# Claves del plan que no son rutas
+NON_ROUTE_KEYS = ("usuarios_con_errores",)
+
+# Campos numéricos que necesita cada parada
+STOP_FIELDS = ('travel_time', 'installation_time', 'estimated_arrival', 'estimated_completion')
+
+
+class RouteSimulator:
+    """
+    Clase para estimar la probabilidad de cumplir un plan de rutas, muestreando
+    escenarios de ruido en los tiempos de viaje e instalación.
+
+    Todos los escenarios de todas las rutas se calculan juntos como matrices
+    (escenarios x paradas), sin bucles de Python por escenario.
+    """
+
+    def __init__(self, work_start, work_end, n_scenarios=10000, travel_cv=0.3, installation_cv=0.25,
+                 day_travel_cv=0.1, on_time_tolerance=0.5, max_stops=500, seed=None):
+        """
+        Constructor para el simulador de rutas.
+
+        Args:
+            work_start: Hora de inicio de la jornada (en horas)
+            work_end: Hora de fin de la jornada (en horas)
+            n_scenarios: Cantidad de escenarios a simular
+            travel_cv: Coeficiente de variación de cada tramo de viaje
+            installation_cv: Coeficiente de variación de cada instalación
+            day_travel_cv: Coeficiente de variación común a todos los tramos de una ruta (tráfico del día)
+            on_time_tolerance: Demora admitida (en horas) respecto de la llegada planificada
+            max_stops: Paradas máximas por simulación; la memoria crece con escenarios x paradas
+            seed: Semilla del generador aleatorio, para resultados reproducibles
+        """
+        self.work_start = work_start
+        self.work_end = work_end
+        self.n_scenarios = n_scenarios
+        self.travel_cv = travel_cv
+        self.installation_cv = installation_cv
+        self.day_travel_cv = day_travel_cv
+        self.on_time_tolerance = on_time_tolerance
+        self.max_stops = max_stops
+        self.rng = np.random.default_rng(seed)
+
+    def simulate(self, routes):
+        """
+        Simula un plan de rutas como el que devuelve RouteOptimizer.optimize_routes.
+
+        Args:
+            routes: Diccionario {clave_ruta: [clientes con estimated_arrival, travel_time,
+                    installation_time y estimated_completion]}
+
+        Returns:
+            Diccionario con la cantidad de escenarios y, por ruta, el riesgo de horas extra
+            y la probabilidad de llegar a tiempo a cada parada
+
+        Raises:
+            ValueError: Si el plan está mal formado o supera max_stops paradas
+        """
+        route_keys, values = self._validate(routes)
+        if not route_keys:
+            return {'escenarios': self.n_scenarios, 'rutas': {}}
+
+        lengths = np.array([len(routes[key]) for key in route_keys])
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+        travel, installation, departure, completion = np.array(values, dtype=np.float32).T
+
+        # Tiempo muerto planificado antes de cada tramo (almuerzo o espera), que se mantiene fijo
+        previous_completion = np.concatenate(([self.work_start], completion[:-1])).astype(np.float32)
+        previous_completion[offsets] = self.work_start
+        idle = np.maximum(departure - previous_completion, 0)
+
+        # Ruido multiplicativo: un factor por ruta (tráfico del día) y uno por tramo
+        route_factor = self._lognormal(self.day_travel_cv, (self.n_scenarios, len(route_keys)))
+        travel_noise = self._lognormal(self.travel_cv, (self.n_scenarios, len(travel)))
+        travel_noise *= np.repeat(route_factor, lengths, axis=1)
+        installation_noise = self._lognormal(self.installation_cv, (self.n_scenarios, len(travel)))
+
+        sampled_travel = travel * travel_noise
+        sampled_installation = installation * installation_noise
+
+        # Suma acumulada por ruta: acumulado global menos el acumulado al inicio de cada ruta
+        elapsed = np.cumsum(idle + sampled_travel + sampled_installation, axis=1)
+        route_base = np.zeros((self.n_scenarios, len(route_keys)), dtype=elapsed.dtype)
+        route_base[:, 1:] = elapsed[:, offsets[1:] - 1]
+        sim_completion = self.work_start + elapsed - np.repeat(route_base, lengths, axis=1)
+        sim_service_start = sim_completion - sampled_installation
+
+        planned_service_start = departure + travel
+        on_time = (sim_service_start <= planned_service_start + self.on_time_tolerance).mean(axis=0)
+        in_shift = (sim_completion <= self.work_end).mean(axis=0)
+        service_start_p90 = np.percentile(sim_service_start, 90, axis=0)
+
+        route_end = sim_completion[:, offsets + lengths - 1]
+        overtime = np.maximum(route_end - self.work_end, 0)
+        overtime_risk = (overtime > 0).mean(axis=0)
+        expected_overtime = overtime.mean(axis=0)
+        end_p50, end_p90 = np.percentile(route_end, [50, 90], axis=0)
+
+        result = {}
+        for r, key in enumerate(route_keys):
+            start = offsets[r]
+            result[key] = {
+                'probabilidad_horas_extra': round(float(overtime_risk[r]), 4),
+                'horas_extra_esperadas': round(float(expected_overtime[r]), 3),
+                'fin_p50': round(float(end_p50[r]), 3),
+                'fin_p90': round(float(end_p90[r]), 3),
+                'paradas': [
+                    {
+                        'orden': i + 1,
+                        'domicilio': routes[key][i].get('Domicilio'),
+                        'probabilidad_a_tiempo': round(float(on_time[start + i]), 4),
+                        'probabilidad_en_horario': round(float(in_shift[start + i]), 4),
+                        'llegada_p90': round(float(service_start_p90[start + i]), 3)
+                    }
+                    for i in range(lengths[r])
+                ]
+            }
+
+        return {'escenarios': self.n_scenarios, 'rutas': result}
+
+    def _validate(self, routes):
+        """
+        Comprueba la forma del plan antes de reservar memoria para la simulación.
+
+        Returns:
+            Tupla (claves de las rutas con paradas, [valores de STOP_FIELDS por parada])
+        """
+        if not isinstance(routes, dict):
+            raise ValueError("El plan debe ser un objeto {ruta: [paradas]}")
+
+        route_keys = []
+        values = []
+        for key, stops in routes.items():
+            if key in NON_ROUTE_KEYS or not stops:
+                continue
+            if not isinstance(stops, list):
+                raise ValueError(f"La ruta '{key}' debe ser una lista de paradas")
+            if len(values) + len(stops) > self.max_stops:
+                raise ValueError(f"El plan supera las {self.max_stops} paradas que se pueden simular")
+
+            route_keys.append(key)
+            for order, stop in enumerate(stops, start=1):
+                if not isinstance(stop, dict):
+                    raise ValueError(f"La parada {order} de '{key}' debe ser un objeto")
+                try:
+                    row = [float(stop[field]) for field in STOP_FIELDS]
+                except (KeyError, TypeError, ValueError):
+                    raise ValueError(
+                        f"La parada {order} de '{key}' debe tener valores numéricos en {', '.join(STOP_FIELDS)}"
+                    ) from None
+                if not all(math.isfinite(value) and value >= 0 for value in row):
+                    raise ValueError(f"La parada {order} de '{key}' tiene tiempos negativos o no finitos")
+                values.append(row)
+
+        return route_keys, values
+
+    def _lognormal(self, cv, shape):
+        """
+        Muestras lognormales de media 1 con el coeficiente de variación indicado.
+
+        Args:
+            cv: Coeficiente de variación (0 devuelve unos)
+            shape: Forma de la matriz a generar
+
+        Returns:
+            Matriz float32 de factores multiplicativos
+        """
+        if cv <= 0:
+            return np.ones(shape, dtype=np.float32)
+        sigma = np.sqrt(np.log1p(cv ** 2))
+        samples = self.rng.standard_normal(shape, dtype=np.float32)
+        return np.exp(samples * np.float32(sigma) - np.float32(sigma ** 2 / 2))
@@ -1,7 +1,8 @@
 """This module contains configuration variables."""
 
+import json
 import os
-from typing import Dict
+from typing import Dict, List
 from dotenv import load_dotenv
 from flask_marshmallow import Marshmallow
 from flask_sqlalchemy import SQLAlchemy
@@ -28,6 +29,34 @@ def load_secrets() -> Dict[str, str]:
     return secrets
 
 
+# Base única usada cuando no se configuran depósitos
+DEFAULT_DEPOT = {"nombre": "base", "coordinates": "-34.6554574,-59.4324731"}
+
+
+def load_depots() -> List[Dict[str, str]]:
+    """
+    Load depots / technician home bases from the DEPOTS environment variable.
+
+    DEPOTS is a JSON list such as [{"nombre": "mercedes", "lat": -34.65, "lng": -59.43}].
+    Falls back to the single default depot when unset or invalid.
+    """
+    load_dotenv()
+    raw_depots = os.getenv("DEPOTS")
+    if not raw_depots:
+        return [dict(DEFAULT_DEPOT)]
+
+    try:
+        depots = [
+            {"nombre": str(depot["nombre"]), "coordinates": f"{float(depot['lat'])},{float(depot['lng'])}"}
+            for depot in json.loads(raw_depots)
+        ]
+    except (ValueError, KeyError, TypeError) as e:
+        logger.error(f"DEPOTS inválido, se usa la base por defecto: {str(e)}")
+        return [dict(DEFAULT_DEPOT)]
+
+    return depots or [dict(DEFAULT_DEPOT)]
+
+
 class Config:
     """Configuration class for the application."""
     secret = load_secrets()
@@ -42,5 +71,6 @@ class Config:
 
     SQLALCHEMY_DATABASE_URI = f'mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SQLALCHEMY_ECHO = True
+    # Loguear cada sentencia SQL solo cuando se pide explícitamente
+    SQLALCHEMY_ECHO = os.getenv('SQLALCHEMY_ECHO', 'false').lower() == 'true'
     SQLALCHEMY_ENGINE_OPTIONS = {'pool_recycle': 280, 'pool_pre_ping': True}
\ No newline at end of file
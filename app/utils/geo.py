@@ -0,0 +1,179 @@
+"""Utilidades geográficas: geohash, distancias y cajas de búsqueda."""
+
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_BASE32_INDEX = {char: index for index, char in enumerate(_BASE32)}
+
+# Precisión por defecto del geohash almacenado (~1.2 km x 0.6 km por celda)
+GEOHASH_PRECISION = 6
+
+
+def geohash_encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """
+    Codifica unas coordenadas en un geohash.
+
+    Args:
+        latitude (float): Latitud en grados
+        longitude (float): Longitud en grados
+        precision (int): Cantidad de caracteres del geohash
+
+    Returns:
+        str: Geohash de la celda que contiene el punto
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(geohash) < precision:
+        value_range, value = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (value_range[0] + value_range[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            value_range[0] = mid
+        else:
+            value_range[1] = mid
+        even = not even
+        bit_count += 1
+
+        if bit_count == 5:
+            geohash.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(geohash)
+
+
+def geohash_decode_bbox(geohash: str) -> tuple:
+    """
+    Devuelve la caja de una celda geohash.
+
+    Returns:
+        tuple: (min_lat, min_lng, max_lat, max_lng)
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+
+    for char in geohash:
+        bits = _BASE32_INDEX[char]
+        for shift in range(4, -1, -1):
+            value_range = lng_range if even else lat_range
+            mid = (value_range[0] + value_range[1]) / 2
+            if (bits >> shift) & 1:
+                value_range[0] = mid
+            else:
+                value_range[1] = mid
+            even = not even
+
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+def geohash_cell_size(precision: int) -> tuple:
+    """Devuelve (alto, ancho) en grados de una celda geohash de la precisión dada."""
+    lng_bits = math.ceil(precision * 5 / 2)
+    lat_bits = math.floor(precision * 5 / 2)
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def geohash_neighbors(geohash: str) -> list[str]:
+    """Devuelve la celda y sus 8 vecinas (misma precisión)."""
+    min_lat, min_lng, max_lat, max_lng = geohash_decode_bbox(geohash)
+    center_lat = (min_lat + max_lat) / 2
+    center_lng = (min_lng + max_lng) / 2
+    height = max_lat - min_lat
+    width = max_lng - min_lng
+
+    cells = []
+    for d_lat in (-height, 0, height):
+        for d_lng in (-width, 0, width):
+            lat = center_lat + d_lat
+            if lat < -90 or lat > 90:
+                continue
+            lng = (center_lng + d_lng + 180) % 360 - 180
+            cell = geohash_encode(lat, lng, len(geohash))
+            if cell not in cells:
+                cells.append(cell)
+    return cells
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Distancia en kilómetros entre dos puntos sobre la esfera terrestre."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bbox_around(latitude: float, longitude: float, radius_km: float) -> tuple:
+    """
+    Calcula la caja que contiene el círculo de radio radius_km alrededor del punto.
+
+    Returns:
+        tuple: (min_lat, min_lng, max_lat, max_lng)
+    """
+    d_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(latitude))
+    if cos_lat < 1e-6:
+        d_lng = 180.0
+    else:
+        d_lng = min(180.0, math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)))
+    return (
+        max(-90.0, latitude - d_lat),
+        max(-180.0, longitude - d_lng),
+        min(90.0, latitude + d_lat),
+        min(180.0, longitude + d_lng),
+    )
+
+
+def geohash_cover(min_lat: float, min_lng: float, max_lat: float, max_lng: float,
+                  max_cells: int = 16) -> list[str]:
+    """
+    Devuelve los prefijos geohash que cubren una caja.
+
+    Elige la precisión más fina (hasta GEOHASH_PRECISION) cuya cobertura no supere
+    max_cells celdas, de modo que cada prefijo se resuelva como un rango del índice.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = geohash_cell_size(precision)
+        rows = math.floor(max_lat / height) - math.floor(min_lat / height) + 1
+        cols = math.floor(max_lng / width) - math.floor(min_lng / width) + 1
+        if rows * cols > max_cells:
+            continue
+
+        cells = []
+        for row in range(rows):
+            lat = min(max_lat, min_lat + row * height)
+            for col in range(cols):
+                lng = min(max_lng, min_lng + col * width)
+                cell = geohash_encode(lat, lng, precision)
+                if cell not in cells:
+                    cells.append(cell)
+        # Asegurar la esquina opuesta en cajas que no caen alineadas a la grilla
+        for lat, lng in ((max_lat, max_lng), (max_lat, min_lng), (min_lat, max_lng)):
+            cell = geohash_encode(lat, lng, precision)
+            if cell not in cells:
+                cells.append(cell)
+        return cells
+
+    return [""]
+
+
+def parse_coordinates(coordinates: str) -> tuple:
+    """Convierte un texto "latitud,longitud" en una tupla de floats."""
+    lat, lng = coordinates.split(",")
+    return float(lat.strip()), float(lng.strip())
+
+
+def normalize_coordinates(coordinates: str, decimals: int = 5) -> str:
+    """Normaliza "latitud,longitud" a un texto con precisión fija (~1 m), usado como clave de caché."""
+    lat, lng = parse_coordinates(coordinates)
+    return f"{lat:.{decimals}f},{lng:.{decimals}f}"
@@ -1,14 +1,173 @@
+"""Logging configuration.
+
+Loggers write to a queue; a single background listener thread per process
+formats the records and writes them to stdout, so request threads never block
+on console I/O.
+"""
+
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import os
+import queue
 import sys
+import threading
+from datetime import datetime, timezone
+
+# Atributos estándar de LogRecord; cualquier otro atributo llega por `extra`
+_RESERVED_ATTRS = frozenset(vars(logging.makeLogRecord({})).keys()) | {"message", "asctime"}
+
+_lock = threading.Lock()
+_queue_handler = None
+_listener = None
+_listener_pid = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc_info"] = record.exc_text
+        if record.stack_info:
+            payload["stack_info"] = record.stack_info
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps the traceback in its own field.
+
+    The stock `prepare` folds the traceback into the message and clears
+    exc_info, so the formatter on the listener side could never render it
+    separately. Here the traceback is rendered once into `exc_text` (exception
+    objects must not cross the queue) and the message is left alone.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _build_formatter() -> logging.Formatter:
+    """Return the formatter selected by LOG_FORMAT (json by default, or text)."""
+    if os.getenv("LOG_FORMAT", "json").lower() == "text":
+        return logging.Formatter('%(asctime)s:%(name)s:%(levelname)s:%(message)s')
+    return JsonFormatter()
+
+
+def _get_queue_handler() -> logging.Handler:
+    """Return the process-wide QueueHandler, starting its listener if needed."""
+    global _queue_handler
+
+    with _lock:
+        if _queue_handler is not None and _listener_pid == os.getpid():
+            return _queue_handler
+        if _queue_handler is None:
+            _queue_handler = _QueueHandler(queue.SimpleQueue())
+        _start_listener()
+        return _queue_handler
+
+
+def _start_listener():
+    """Give the handler a fresh queue and start a writer thread for it in this process."""
+    global _listener, _listener_pid
+
+    # Una cola nueva: la heredada del padre puede tener registros que ya escribió él
+    log_queue = queue.SimpleQueue()
+    _queue_handler.queue = log_queue
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(_build_formatter())
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    _listener_pid = os.getpid()
+
+
+def _after_fork_in_child():
+    """Restart the writer thread in forked children (e.g. gunicorn --preload workers).
+
+    Threads do not survive fork, so without this the child would enqueue
+    records that nobody writes until something calls get_logger again.
+    """
+    global _lock
+
+    # El lock pudo quedar tomado por otro hilo del padre en el momento del fork
+    _lock = threading.Lock()
+    if _queue_handler is not None:
+        _start_listener()
+
+
+def _stop_listener():
+    """Flush pending records on interpreter exit."""
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.stop()
+
+
+atexit.register(_stop_listener)
+os.register_at_fork(after_in_child=_after_fork_in_child)
 
 
 def get_logger(name: str) -> logging.Logger:
-    """Return a logger object."""
+    """Return a logger object.
+
+    Safe to call repeatedly: the queue handler is attached only once per logger.
+    """
     logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
-    formatter = logging.Formatter('%(asctime)s:%(name)s:%(levelname)s:%(message)s')
-    stream_handler = logging.StreamHandler(sys.stdout)
-    stream_handler.setFormatter(formatter)
-    logger.addHandler(stream_handler)
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    handler = _get_queue_handler()
+    if handler not in logger.handlers:
+        logger.addHandler(handler)
     logger.propagate = False
     return logger
+
+
+class LogAggregator:
+    """Accumulate per-call events and emit them as a single summary record.
+
+    Hot paths call `add` instead of logging each event; the caller decides when
+    a unit of work is done (e.g. a locality) and calls `flush`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._totals = {}
+
+    def add(self, event: str, **values: float):
+        """Count one occurrence of `event` and add up its numeric values."""
+        with self._lock:
+            self._counts[event] = self._counts.get(event, 0) + 1
+            for key, value in values.items():
+                total_key = f"{event}_{key}"
+                self._totals[total_key] = self._totals.get(total_key, 0) + value
+
+    def flush(self, logger: logging.Logger, message: str, level: int = logging.INFO, **context):
+        """Emit the accumulated counters as one record and reset them."""
+        with self._lock:
+            counts, totals = self._counts, self._totals
+            self._counts, self._totals = {}, {}
+
+        if not counts or not logger.isEnabledFor(level):
+            return
+        summary = {key: round(value, 3) for key, value in totals.items()}
+        logger.log(level, message, extra={"counts": counts, "totals": summary, **context})
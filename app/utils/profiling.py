@@ -0,0 +1,188 @@
+"""Opt-in statistical profiling of individual requests.
+
+A request is profiled when it carries the profiling secret (``X-Profile``
+header or ``profile`` query param) or is picked by PROFILING_SAMPLE_RATE.
+A background thread samples the request thread's stack at a fixed interval
+and the result is stored in collapsed-stack format, which flamegraph.pl,
+speedscope and inferno read directly.
+
+When no secret is configured and the sample rate is 0 no request hooks are
+registered at all; otherwise requests that are not profiled pay one header
+lookup and one random draw.
+"""
+
+import hmac
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from flask import Flask, g, request
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PROFILE_SUFFIX = ".folded"
+
+
+class SamplingProfiler:
+    """Sample one thread's call stack from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        """Start sampling."""
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the sampler thread."""
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)  # pylint: disable=protected-access
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Return the samples in collapsed-stack format ("root;...;leaf count")."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileStore:
+    """Keep the most recent profiles as files in a directory."""
+
+    def __init__(self, directory: str, max_files: int):
+        self.directory = directory
+        self.max_files = max_files
+
+    def save(self, name: str, content: str) -> str:
+        """Write a profile and drop the oldest ones beyond max_files."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, name), "w", encoding="utf-8") as profile_file:
+            profile_file.write(content)
+        for old in self.list()[self.max_files:]:
+            try:
+                os.remove(os.path.join(self.directory, old["name"]))
+            except FileNotFoundError:
+                pass
+        return name
+
+    def list(self) -> list[dict]:
+        """Return stored profiles, newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(PROFILE_SUFFIX):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            profiles.append({
+                "name": name,
+                "size_bytes": stat.st_size,
+                "created_at": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc).isoformat(),
+            })
+        return sorted(profiles, key=lambda profile: profile["name"], reverse=True)
+
+    def path(self, name: str) -> str | None:
+        """Return the path of a stored profile, or None for unknown/unsafe names."""
+        if os.path.basename(name) != name or not name.endswith(PROFILE_SUFFIX):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+
+class RequestProfiling:
+    """Flask extension wiring the profiler into the request lifecycle."""
+
+    def __init__(self, secret: str | None, sample_rate: float, interval: float, store: ProfileStore):
+        self.secret = secret
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.store = store
+        self.enabled = bool(secret) or sample_rate > 0
+
+    def is_authorized(self, token: str | None) -> bool:
+        """Check a token against the profiling secret in constant time."""
+        if not (self.secret and token):
+            return False
+        # compare_digest only accepts ASCII str; bytes work for any token a client sends
+        return hmac.compare_digest(token.encode("utf-8"), self.secret.encode("utf-8"))
+
+    def before_request(self):
+        """Start a profiler if this request asked for one or was sampled."""
+        # Reading profiles carries the secret too; don't let it evict real ones
+        if request.blueprint == "profiling":
+            return
+        token = request.headers.get("X-Profile") or request.args.get("profile")
+        if not (self.is_authorized(token) or (self.sample_rate and random.random() < self.sample_rate)):
+            return
+        profiler = SamplingProfiler(threading.get_ident(), self.interval)
+        g.profiler = profiler
+        g.profiler_started = time.perf_counter()
+        profiler.start()
+
+    def after_request(self, response):
+        """Stop the profiler, store the profile and point to it in X-Profile-Id."""
+        profiler = g.pop("profiler", None)
+        if profiler is None:
+            return response
+        profiler.stop()
+        elapsed_ms = (time.perf_counter() - g.pop("profiler_started")) * 1000
+
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        endpoint = re.sub(r"[^A-Za-z0-9]+", "_", request.path).strip("_") or "root"
+        name = f"{timestamp}_{request.method}_{endpoint}_{elapsed_ms:.0f}ms{PROFILE_SUFFIX}"
+        try:
+            self.store.save(name, profiler.collapsed())
+            response.headers["X-Profile-Id"] = name
+            logger.info("Perfil de request guardado", extra={"profile": name, "samples": profiler.samples})
+        except OSError as e:
+            logger.error(f"No se pudo guardar el perfil: {str(e)}")
+        return response
+
+    @staticmethod
+    def teardown_request(_exc):
+        """Make sure the sampler thread never outlives the request."""
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.stop()
+
+
+def init_profiling(app: Flask) -> RequestProfiling:
+    """Configure request profiling from the environment and register its hooks."""
+    profiling = RequestProfiling(
+        secret=os.getenv("PROFILING_SECRET") or None,
+        sample_rate=float(os.getenv("PROFILING_SAMPLE_RATE", "0")),
+        interval=float(os.getenv("PROFILING_INTERVAL_MS", "5")) / 1000,
+        store=ProfileStore(
+            directory=os.getenv("PROFILING_DIR", os.path.join(tempfile.gettempdir(), "profiles")),
+            max_files=int(os.getenv("PROFILING_MAX_FILES", "50")),
+        ),
+    )
+    app.extensions["request_profiling"] = profiling
+    if profiling.enabled:
+        app.before_request(profiling.before_request)
+        app.after_request(profiling.after_request)
+        app.teardown_request(profiling.teardown_request)
+    return profiling
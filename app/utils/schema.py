@@ -0,0 +1,52 @@
+"""Creación incremental del esquema: tablas, columnas e índices que falten en la base."""
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def ensure_schema(engine, tables) -> list[str]:
+    """
+    Crea en la base lo que falte de las tablas indicadas, sin tocar lo existente.
+
+    Las tablas nuevas se crean completas. En las existentes solo se agregan las columnas
+    (que deben admitir NULL) y los índices que falten; nunca se borra ni modifica nada.
+
+    Args:
+        engine: Engine de SQLAlchemy
+        tables: Tablas (Model.__table__) a sincronizar, en orden de dependencias
+
+    Returns:
+        list: Descripción de cada cambio aplicado
+    """
+    changes = []
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in tables:
+            if not inspector.has_table(table.name):
+                table.create(conn)
+                changes.append(f"Tabla creada: {table.name}")
+                continue
+
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                if not column.nullable:
+                    raise ValueError(f"La columna {table.name}.{column.name} no admite NULL: agregarla a mano")
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+                changes.append(f"Columna agregada: {table.name}.{column.name}")
+
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in sorted(table.indexes, key=lambda item: item.name):
+                if index.name not in existing_indexes:
+                    index.create(conn)
+                    changes.append(f"Índice creado: {index.name}")
+
+    for change in changes:
+        logger.info(change)
+    return changes
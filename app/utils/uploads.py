@@ -0,0 +1,186 @@
+"""Lectura incremental de archivos de clientes: CSV, CSV comprimido (gzip/zip) y Excel (.xlsx)."""
+
+import codecs
+import csv
+import gzip
+import io
+import zipfile
+from contextlib import contextmanager
+from datetime import date, datetime
+
+from chardet.universaldetector import UniversalDetector
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+# Extensiones aceptadas y el formato con que se leen
+UPLOAD_FORMATS = {
+    ".csv.gz": "gzip",
+    ".gz": "gzip",
+    ".zip": "zip",
+    ".xlsx": "xlsx",
+    ".csv": "csv",
+}
+
+# Bytes como máximo que se leen para detectar la codificación
+ENCODING_SAMPLE_BYTES = 1024 * 1024
+_CHUNK_SIZE = 64 * 1024
+
+# Manejador de errores de decodificación registrado en codecs (ver _decode_as_windows)
+DECODE_FALLBACK = "ipnext_windows_fallback"
+
+
+def _decode_as_windows(error):
+    """
+    Decodifica como Windows-1252 (o Latin-1) los bytes que la codificación detectada no acepta.
+
+    La detección usa solo una muestra: un export en Windows-1252 cuyo primer MB es ASCII
+    se detecta como UTF-8 y falla recién con la primera 'ñ'. Así se sigue en la misma
+    pasada en lugar de volver a leer (y descomprimir) el archivo con otra codificación.
+    """
+    if not isinstance(error, UnicodeDecodeError):
+        raise error
+    invalid = error.object[error.start:error.end]
+    try:
+        return invalid.decode('windows-1252'), error.end
+    except UnicodeDecodeError:
+        return invalid.decode('latin-1'), error.end
+
+
+codecs.register_error(DECODE_FALLBACK, _decode_as_windows)
+
+
+def upload_format(filename: str) -> str | None:
+    """
+    Devuelve el formato de un archivo según su extensión.
+
+    Returns:
+        str | None: 'csv', 'gzip', 'zip', 'xlsx' o None si no es un formato aceptado
+    """
+    name = filename.lower()
+    for extension, file_format in UPLOAD_FORMATS.items():
+        if name.endswith(extension):
+            return file_format
+    return None
+
+
+def detect_encoding(file_path: str) -> tuple:
+    """
+    Detecta la codificación del texto de un archivo (ya descomprimido) leyendo solo una muestra.
+
+    Returns:
+        tuple: (codificación, confianza)
+    """
+    detector = UniversalDetector()
+    with open_binary(file_path) as raw_file:
+        read = 0
+        while read < ENCODING_SAMPLE_BYTES and not detector.done:
+            chunk = raw_file.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            detector.feed(chunk)
+            read += len(chunk)
+    result = detector.close()
+
+    encoding = result['encoding'] or 'utf-8'
+    # Una muestra ASCII no garantiza que el resto lo sea: UTF-8 es superconjunto
+    if encoding.lower() == 'ascii':
+        encoding = 'utf-8'
+    return encoding, result['confidence']
+
+
+@contextmanager
+def open_binary(file_path: str):
+    """
+    Abre el contenido CSV de un archivo como flujo binario, descomprimiéndolo al vuelo.
+
+    Raises:
+        ValueError: Si el archivo comprimido está dañado o es un ZIP sin ningún CSV
+    """
+    file_format = upload_format(file_path)
+
+    try:
+        if file_format == "gzip":
+            with gzip.open(file_path, 'rb') as raw_file:
+                yield raw_file
+        elif file_format == "zip":
+            with zipfile.ZipFile(file_path) as archive:
+                members = [
+                    info for info in archive.infolist()
+                    if not info.is_dir() and info.filename.lower().endswith('.csv')
+                ]
+                if not members:
+                    raise ValueError("El archivo ZIP no contiene ningún CSV")
+                with archive.open(members[0]) as raw_file:
+                    yield raw_file
+        elif file_format == "csv":
+            with open(file_path, 'rb') as raw_file:
+                yield raw_file
+        else:
+            raise ValueError(f"Formato de archivo no soportado: {file_path}")
+    # gzip falla recién al leer: los errores del cuerpo del with también llegan acá
+    except (zipfile.BadZipFile, gzip.BadGzipFile, EOFError) as e:
+        raise ValueError(f"El archivo está dañado o no corresponde a su extensión: {str(e)}") from e
+
+
+def iter_rows(file_path: str, encoding: str | None = None):
+    """
+    Recorre las filas de un archivo de clientes sin cargarlo completo en memoria.
+
+    Los CSV (también dentro de .gz/.zip) se leen con ';' como separador; en los .xlsx
+    se usa la primera hoja y su primera fila como encabezado.
+
+    Args:
+        file_path (str): Ruta al archivo
+        encoding (str): Codificación del texto (ignorada en .xlsx)
+
+    Yields:
+        dict: Fila como {columna: valor en texto}
+
+    Raises:
+        ValueError: Si el archivo está dañado, no es del formato que indica su extensión
+                    o es un ZIP sin ningún CSV
+    """
+    if upload_format(file_path) == "xlsx":
+        yield from _iter_xlsx_rows(file_path)
+        return
+
+    with open_binary(file_path) as raw_file:
+        text_file = io.TextIOWrapper(raw_file, encoding=encoding or 'utf-8', errors=DECODE_FALLBACK,
+                                     newline='')
+        yield from csv.DictReader(text_file, delimiter=';')
+
+
+def _iter_xlsx_rows(file_path: str):
+    """Lee la primera hoja de un .xlsx en modo streaming (read_only)."""
+    try:
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError) as e:
+        raise ValueError(f"El archivo está dañado o no corresponde a su extensión: {str(e)}") from e
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header:
+            return
+        columns = [_cell_text(value) for value in header]
+
+        for values in rows:
+            if values is None or all(value is None for value in values):
+                continue
+            yield {
+                column: _cell_text(value)
+                for column, value in zip(columns, values)
+                if column
+            }
+    finally:
+        workbook.close()
+
+
+def _cell_text(value) -> str:
+    """Convierte una celda a texto, igual que se vería exportada a CSV."""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value).strip()
@@ -0,0 +1 @@
+"""Load-testing tools: a local Google Maps stand-in and an upload driver."""
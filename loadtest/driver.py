@@ -0,0 +1,249 @@
+"""Concurrent CSV upload driver for /logistica/upload_csv.
+
+Runs every combination of CSV size and concurrency level, reports throughput,
+latency percentiles, error rate and estimated worker saturation, and saves the
+results as JSON so later runs can be compared against a baseline.
+
+Every level uploads clients nobody has uploaded before (the payload seed
+combines a per-run seed with the level), so each level starts with a cold
+Maps cache instead of reusing the geocodes and travel times of earlier ones.
+
+    python -m loadtest.driver --url http://localhost:8080 --sizes 10,50,200 \
+        --concurrency 1,4,8 --requests 20 --workers 1 --compare loadtest/results/baseline.json
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+
+LOCALITIES = ("Mercedes", "Gowland", "Suipacha", "Chivilcoy", "Tomas Jofre", "Altamira")
+STREETS = ("Calle", "Avenida", "Ruta", "Pasaje")
+UPLOAD_PATH = "/logistica/upload_csv"
+MAPS_STATUS_PATH = "/logistica/maps/estado"
+
+
+def build_csv(size: int, seed: str) -> bytes:
+    """Build a `;`-separated CSV with the columns the optimizer reads; addresses depend on `seed`."""
+    rng = random.Random(seed)
+    lines = ["email;Nombre;Domicilio;Localidad"]
+    for i in range(size):
+        locality = rng.choice(LOCALITIES)
+        address = f"{rng.choice(STREETS)} {rng.randint(1, 60)} {rng.randint(100, 2999)}, {locality}"
+        lines.append(f"cliente{seed}_{i}@example.com;Cliente {i};{address};{locality}")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile; 0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def upload(session: requests.Session, url: str, payload: bytes, timeout: float) -> tuple:
+    """Send one upload; return (latency seconds, ok)."""
+    started = time.perf_counter()
+    try:
+        response = session.post(
+            url,
+            files={"file": ("carga.csv", payload, "text/csv")},
+            timeout=timeout,
+        )
+        ok = response.status_code == 200
+    except requests.RequestException:
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+def run_level(url: str, size: int, concurrency: int, total_requests: int, timeout: float,
+              run_seed: str) -> dict:
+    """Fire `total_requests` uploads of `size` rows with `concurrency` in flight."""
+    payloads = [build_csv(size, f"{run_seed}-{size}-{concurrency}-{i}") for i in range(total_requests)]
+
+    # requests.Session is not thread-safe: each pool thread keeps its own
+    local = threading.local()
+    sessions = []
+    sessions_lock = threading.Lock()
+
+    def thread_session() -> requests.Session:
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+            with sessions_lock:
+                sessions.append(local.session)
+        return local.session
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(
+            lambda payload: upload(thread_session(), url, payload, timeout),
+            payloads,
+        ))
+    wall = time.perf_counter() - started
+    for session in sessions:
+        session.close()
+
+    latencies = [latency for latency, ok in results if ok]
+    errors = sum(1 for _, ok in results if not ok)
+    return {
+        "size": size,
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "throughput_rps": round(len(latencies) / wall, 3) if wall else 0.0,
+        "p50_s": round(percentile(latencies, 50), 4),
+        "p95_s": round(percentile(latencies, 95), 4),
+        "p99_s": round(percentile(latencies, 99), 4),
+        "mean_s": round(statistics.fmean(latencies), 4) if latencies else 0.0,
+        "error_rate": round(errors / total_requests, 4),
+    }
+
+
+def maps_status(base_url: str, timeout: float) -> dict | None:
+    """Read the app's Maps quota/breaker state; None if the endpoint is unavailable."""
+    try:
+        response = requests.get(base_url + MAPS_STATUS_PATH, timeout=timeout)
+        return response.json() if response.status_code == 200 else None
+    except (requests.RequestException, ValueError):
+        return None
+
+
+def add_saturation(levels: list, workers: int):
+    """Estimate worker utilization with Little's law.
+
+    The service time of a size is the mean latency at the lowest concurrency
+    measured; utilization = throughput x service time / workers. Values near 1
+    mean every worker is busy and extra concurrency only adds queueing, which
+    `queueing_factor` (p50 / service time) makes visible.
+    """
+    service_time = {}
+    for level in sorted(levels, key=lambda item: item["concurrency"]):
+        if level["mean_s"]:
+            service_time.setdefault(level["size"], level["mean_s"])
+
+    for level in levels:
+        base = service_time.get(level["size"])
+        if not base:
+            level["worker_utilization"] = None
+            level["queueing_factor"] = None
+            continue
+        level["worker_utilization"] = round(min(1.0, level["throughput_rps"] * base / workers), 3)
+        level["queueing_factor"] = round(level["p50_s"] / base, 3)
+
+
+def compare(levels: list, baseline_path: str, threshold: float) -> list:
+    """Return the regressions of `levels` against a saved baseline."""
+    with open(baseline_path, encoding="utf-8") as baseline_file:
+        baseline = {
+            (level["size"], level["concurrency"]): level
+            for level in json.load(baseline_file)["levels"]
+        }
+
+    regressions = []
+    for level in levels:
+        previous = baseline.get((level["size"], level["concurrency"]))
+        if not previous:
+            continue
+        for metric in ("p50_s", "p95_s", "p99_s"):
+            if previous[metric] and level[metric] > previous[metric] * (1 + threshold):
+                regressions.append(
+                    f"size={level['size']} c={level['concurrency']} {metric}: "
+                    f"{previous[metric]} -> {level[metric]}"
+                )
+        if previous["throughput_rps"] and level["throughput_rps"] < previous["throughput_rps"] * (1 - threshold):
+            regressions.append(
+                f"size={level['size']} c={level['concurrency']} throughput_rps: "
+                f"{previous['throughput_rps']} -> {level['throughput_rps']}"
+            )
+        if level["error_rate"] > previous["error_rate"] + 0.01:
+            regressions.append(
+                f"size={level['size']} c={level['concurrency']} error_rate: "
+                f"{previous['error_rate']} -> {level['error_rate']}"
+            )
+    return regressions
+
+
+def print_table(levels: list):
+    """Print one line per (size, concurrency) level."""
+    header = f"{'size':>6} {'conc':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>6} {'util':>6} {'queue':>6}"
+    print(header)
+    for level in levels:
+        print(
+            f"{level['size']:>6} {level['concurrency']:>5} {level['throughput_rps']:>8} "
+            f"{level['p50_s']:>8} {level['p95_s']:>8} {level['p99_s']:>8} {level['error_rate']:>6} "
+            f"{str(level['worker_utilization']):>6} {str(level['queueing_factor']):>6}"
+        )
+
+
+def main():
+    """Parse arguments, run all levels and save the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8080", help="Base URL of the app.")
+    parser.add_argument("--sizes", default="10,50,200", help="CSV row counts, comma separated.")
+    parser.add_argument("--concurrency", default="1,4,8", help="In-flight uploads, comma separated.")
+    parser.add_argument("--requests", type=int, default=20, help="Uploads per level.")
+    parser.add_argument("--workers", type=int, default=1, help="gunicorn workers serving the app.")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds.")
+    parser.add_argument("--output", default=None, help="Results file (default loadtest/results/<timestamp>.json).")
+    parser.add_argument("--compare", default=None, help="Baseline results file to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative regression.")
+    parser.add_argument("--seed", default=None,
+                        help="Payload seed (default: the run timestamp). Reusing one re-uploads cached clients.")
+    args = parser.parse_args()
+
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    run_seed = args.seed or timestamp
+    base_url = args.url.rstrip("/")
+    url = base_url + UPLOAD_PATH
+    sizes = [int(size) for size in args.sizes.split(",")]
+    levels_concurrency = [int(level) for level in args.concurrency.split(",")]
+
+    levels = []
+    for size in sizes:
+        for concurrency in levels_concurrency:
+            print(f"Running size={size} concurrency={concurrency} ...", file=sys.stderr)
+            levels.append(run_level(url, size, concurrency, args.requests, args.timeout, run_seed))
+    add_saturation(levels, args.workers)
+    print_table(levels)
+
+    # Quota exhausted or breaker open means part of the run used distance estimates, not the API
+    status = maps_status(base_url, args.timeout)
+    if status and (status.get("circuito_abierto")
+                   or status.get("elementos_usados", 0) >= status.get("presupuesto_diario", float("inf"))):
+        print("WARNING Maps quota exhausted or circuit open: results include degraded travel-time "
+              "estimates. Raise MAPS_DAILY_ELEMENT_BUDGET for stub runs.", file=sys.stderr)
+
+    output = args.output or os.path.join(os.path.dirname(__file__), "results", f"{timestamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as output_file:
+        json.dump({
+            "timestamp": timestamp,
+            "seed": run_seed,
+            "url": url,
+            "workers": args.workers,
+            "requests_per_level": args.requests,
+            "maps_status": status,
+            "levels": levels,
+        }, output_file, indent=2)
+    print(f"Results saved to {output}")
+
+    if args.compare:
+        regressions = compare(levels, args.compare, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
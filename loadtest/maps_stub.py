@@ -0,0 +1,181 @@
+"""Local stand-in for the Google Maps Geocoding and Distance Matrix APIs.
+
+Serves the two endpoints the app uses with configurable latency and error
+rates, so load tests neither spend API quota nor depend on Google's latency.
+
+    python -m loadtest.maps_stub --port 8081 --latency-ms 80 --error-rate 0.01
+
+Point the app at it with GOOGLE_MAPS_BASE_URL=http://localhost:8081.
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Centro alrededor del cual se generan las coordenadas de las direcciones
+BASE_LAT = -34.6554574
+BASE_LNG = -59.4324731
+# Velocidad simulada en línea recta
+SPEED_KMH = 40.0
+
+
+def _address_to_coords(address: str) -> tuple:
+    """Deterministic coordinates within ~50 km of the base point."""
+    digest = hashlib.sha256(address.strip().lower().encode()).digest()
+    d_lat = (int.from_bytes(digest[:4], "big") / 2 ** 32 - 0.5) * 0.9
+    d_lng = (int.from_bytes(digest[4:8], "big") / 2 ** 32 - 0.5) * 1.1
+    return BASE_LAT + d_lat, BASE_LNG + d_lng
+
+
+def _parse_point(point: str) -> tuple:
+    """Parse "lat,lng"; anything else is treated as an address."""
+    try:
+        lat, lng = point.split(",")
+        return float(lat), float(lng)
+    except ValueError:
+        return _address_to_coords(point)
+
+
+def _distance_km(a: tuple, b: tuple) -> float:
+    """Haversine distance."""
+    phi1, phi2 = math.radians(a[0]), math.radians(b[0])
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(b[1] - a[1])
+    h = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * 6371.0 * math.asin(min(1.0, math.sqrt(h)))
+
+
+def _element(origin: tuple, destination: tuple) -> dict:
+    """One Distance Matrix element with road distance ~1.3x the straight line."""
+    road_km = _distance_km(origin, destination) * 1.3
+    seconds = int(road_km / SPEED_KMH * 3600) + 60
+    return {
+        "status": "OK",
+        "distance": {"value": int(road_km * 1000), "text": f"{road_km:.1f} km"},
+        "duration": {"value": seconds, "text": f"{round(seconds / 60)} mins"},
+        "duration_in_traffic": {"value": int(seconds * 1.15), "text": f"{round(seconds * 1.15 / 60)} mins"},
+    }
+
+
+class MapsStubHandler(BaseHTTPRequestHandler):
+    """Request handler; behaviour is configured on the server instance."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serve geocode and distancematrix requests."""
+        server = self.server
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        delay = max(0.0, random.gauss(server.latency_s, server.jitter_s))
+        if random.random() < server.timeout_rate:
+            delay = server.timeout_s
+        time.sleep(delay)
+
+        if random.random() < server.error_rate:
+            self._send({"status": server.error_status, "rows": [], "results": []})
+        elif url.path == "/maps/api/geocode/json":
+            self._send(self._geocode(params.get("address", "")))
+        elif url.path == "/maps/api/distancematrix/json":
+            self._send(self._distance_matrix(params))
+        else:
+            self._send({"status": "NOT_FOUND"}, code=404)
+
+        server.count(url.path)
+
+    @staticmethod
+    def _geocode(address: str) -> dict:
+        lat, lng = _address_to_coords(address)
+        return {
+            "status": "OK",
+            "results": [{
+                "geometry": {"location": {"lat": lat, "lng": lng}},
+                "formatted_address": address,
+            }],
+        }
+
+    @staticmethod
+    def _distance_matrix(params: dict) -> dict:
+        origins = [_parse_point(point) for point in params.get("origins", "").split("|") if point]
+        destinations = [_parse_point(point) for point in params.get("destinations", "").split("|") if point]
+        return {
+            "status": "OK",
+            "rows": [
+                {"elements": [_element(origin, destination) for destination in destinations]}
+                for origin in origins
+            ],
+        }
+
+    def _send(self, payload: dict, code: int = 200):
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Silence per-request logging; counters are printed on exit."""
+
+
+class MapsStubServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the stub configuration and request counters."""
+
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms=50.0, jitter_ms=10.0, error_rate=0.0,
+                 error_status="OVER_QUERY_LIMIT", timeout_rate=0.0, timeout_s=15.0):
+        super().__init__(address, MapsStubHandler)
+        self.latency_s = latency_ms / 1000
+        self.jitter_s = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.timeout_rate = timeout_rate
+        self.timeout_s = timeout_s
+        self.counters = {}
+
+    def count(self, path: str):
+        """Count served requests per endpoint."""
+        self.counters[path] = self.counters.get(path, 0) + 1
+
+
+def main():
+    """Run the stub until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Mean response latency.")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="Latency standard deviation.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with --error-status.")
+    parser.add_argument("--error-status", default="OVER_QUERY_LIMIT")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Fraction of requests delayed by --timeout-s.")
+    parser.add_argument("--timeout-s", type=float, default=15.0)
+    args = parser.parse_args()
+
+    server = MapsStubServer(
+        (args.host, args.port),
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        timeout_rate=args.timeout_rate,
+        timeout_s=args.timeout_s,
+    )
+    print(f"Maps stub listening on {args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Requests served: {server.counters}")
+
+
+if __name__ == "__main__":
+    main()